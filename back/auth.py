@@ -38,6 +38,10 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    return get_user_from_token(db, token)
+
+# 헤더를 쓸 수 없는 경우(EventSource 등)에도 같은 검증을 쓰기 위해 분리
+def get_user_from_token(db: Session, token: str):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="자격 증명을 검증할 수 없습니다.",
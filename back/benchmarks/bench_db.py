@@ -0,0 +1,160 @@
+# back/benchmarks/bench_db.py
+# 자주 쓰는 요청들의 요청당 DB 시간 측정 (prepared statement / 쓰기 파이프라인 전후 비교)
+# 실행: cd back
+#   python -m benchmarks.bench_db seed [기록 수]      벤치용 유저 + 기록 생성 (기본 1000판, 6시간 간격)
+#   python -m benchmarks.bench_db run [반복 횟수]     현재 설정(.env / 환경변수)으로 측정
+#   python -m benchmarks.bench_db compare [반복 횟수] 끈 상태(DB_PREPARE_THRESHOLD=off, DB_PIPELINE_WRITES=0)와 나란히 비교
+import copy
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+import crud  # models 보다 먼저 로드되어야 함 (순환 import)
+import schemas
+from database import SessionLocal, engine
+from crud.stats import get_yesterday
+from sqlalchemy import event
+from parser import parse_battle_report
+from benchmarks.bench_parser import SAMPLES
+
+BENCH_USERNAME = "bench_db_user"
+TIERS = ["10", "11", "12"]
+BASE_REPORT = parse_battle_report(SAMPLES["ko"])
+
+def _report(battle_date: datetime, rng: random.Random) -> dict:
+    parsed = copy.deepcopy(BASE_REPORT)
+    main = parsed["main"]
+    main["battle_date"] = battle_date
+    main["tier"] = rng.choice(TIERS)
+    main["wave"] = rng.randint(3000, 9000)
+    main["coin_earned"] = rng.randint(5, 20) * 10**12
+    main["cells_earned"] = rng.randint(5000, 20000)
+    main["real_time_seconds"] = rng.randint(3, 8) * 3600
+    return parsed
+
+def _bench_user(db):
+    user = crud.get_user_by_username(db, BENCH_USERNAME)
+    if not user:
+        sys.exit("벤치용 데이터가 없습니다. 먼저 python -m benchmarks.bench_db seed")
+    return user
+
+def seed(count: int = 1000):
+    db = SessionLocal()
+    try:
+        user = crud.get_user_by_username(db, BENCH_USERNAME)
+        if user:
+            crud.bulk_delete_reports(db, user.id)
+        else:
+            user = crud.create_user(db, schemas.UserCreate(username=BENCH_USERNAME, password="bench"), hashed_password="-")
+
+        rng = random.Random(42)
+        latest = datetime.now().replace(minute=0, second=0, microsecond=0) - timedelta(hours=1)
+        for i in range(count):
+            crud.create_battle_record(db, _report(latest - timedelta(hours=6 * i), rng), user.id)
+        print(f"seeded {count} reports for {BENCH_USERNAME} (id={user.id})")
+    finally:
+        db.close()
+
+# 요청 하나 = 세션 하나 (get_db 와 같음). 이름 -> fn(db, rng)
+def _scenarios(user, dates):
+    yesterday = get_yesterday()
+    return {
+        "auth lookup": lambda db, rng: crud.get_user_by_username(db, BENCH_USERNAME),
+        "recent reports": lambda db, rng: crud.get_recent_reports(db, user.id),
+        "history view": lambda db, rng: crud.get_history_view(db, user.id),
+        "history page": lambda db, rng: crud.get_history_reports(db, user.id, skip=rng.randint(0, 5) * 50, limit=50),
+        "report detail": lambda db, rng: crud.get_full_report(db, rng.choice(dates), user.id),
+        "weekly stats": lambda db, rng: crud.get_weekly_stats(db, user.id),
+        "weekly trends": lambda db, rng: crud.get_weekly_trends(db, user.id),
+        "monthly stats": lambda db, rng: crud.get_bucketed_stats(
+            db, user.id, ["coins", "cells", "runs"], "month",
+            start_date=yesterday - timedelta(days=365), end_date=yesterday + timedelta(days=1)
+        ),
+        # 기존 기록 덮어쓰기 (데이터 크기 유지)
+        "create report": lambda db, rng: crud.create_battle_record(db, _report(rng.choice(dates), rng), user.id),
+    }
+
+def run(iterations: int = 200) -> dict:
+    statements = [0]
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.__setitem__(0, statements[0] + 1))
+
+    db = SessionLocal()
+    try:
+        user = _bench_user(db)
+        dates = _seeded_dates(db, user.id)
+    finally:
+        db.close()
+
+    rng = random.Random(7)
+    results = {}
+    for name, fn in _scenarios(user, dates).items():
+        timings = []
+        statements[0] = 0
+        for i in range(iterations + 10):
+            db = SessionLocal()
+            started = time.perf_counter()
+            try:
+                fn(db, rng)
+                db.commit()
+            finally:
+                db.close()
+            if i >= 10:  # 워밍업 (커넥션 생성, 컴파일 캐시, PREPARE)
+                timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        results[name] = {
+            "p50": statistics.median(timings),
+            "p95": timings[int(len(timings) * 0.95) - 1],
+            "statements": statements[0] / (iterations + 10),
+        }
+    return results
+
+def _seeded_dates(db, user_id: int):
+    from models import BattleMain
+    return [d for (d,) in db.query(BattleMain.battle_date).filter(BattleMain.owner_id == user_id).all()]
+
+def _print(results: dict):
+    for name, r in results.items():
+        print(f"{name:<16} p50 {r['p50']:7.2f} ms | p95 {r['p95']:7.2f} ms | {r['statements']:4.1f} stmts")
+
+def compare(iterations: int = 200):
+    configs = {
+        "before": {"DB_PREPARE_THRESHOLD": "off", "DB_PIPELINE_WRITES": "0"},
+        "after": {},
+    }
+    results = {}
+    for label, overrides in configs.items():
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_db", "run", str(iterations), "--json"],
+            env={**os.environ, **overrides}, capture_output=True, text=True, check=True
+        ).stdout
+        results[label] = json.loads(out.strip().splitlines()[-1])
+
+    print(f"{'':<16} {'before p50':>11} {'after p50':>10} {'before p95':>11} {'after p95':>10}   stmts")
+    for name, before in results["before"].items():
+        after = results["after"][name]
+        print(
+            f"{name:<16} {before['p50']:8.2f} ms {after['p50']:7.2f} ms "
+            f"{before['p95']:8.2f} ms {after['p95']:7.2f} ms   {after['statements']:4.1f}"
+        )
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "run"
+    number = int(sys.argv[2]) if len(sys.argv) > 2 and sys.argv[2].isdigit() else None
+    if command == "seed":
+        seed(number or 1000)
+    elif command == "run":
+        results = run(number or 200)
+        if "--json" in sys.argv:
+            print(json.dumps(results))
+        else:
+            _print(results)
+    elif command == "compare":
+        compare(number or 200)
+    else:
+        print("usage: python -m benchmarks.bench_db seed|run|compare [N]")
+        sys.exit(1)
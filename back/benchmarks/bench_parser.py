@@ -0,0 +1,136 @@
+# back/benchmarks/bench_parser.py
+# 언어별 전투 기록 파싱 속도 측정 (언어 판별 포함)
+# 실행: cd back && python -m benchmarks.bench_parser [반복 횟수]
+import sys
+import timeit
+from parser import parse_battle_report, detect_grammar
+
+# 같은 전투를 언어만 바꿔 붙여넣은 기록 (파싱 결과는 locale 외에 같아야 함)
+SAMPLES = {
+    'ko': """전투 보고
+전투 날짜\t10월 14, 2024 13:45
+게임 시간\t1일 2시간 3분 4초
+실시간\t5시간 6분 7초
+티어\t11
+웨이브\t5,123
+처치자\t스캐터
+코인 획득\t12.34T
+시간당 코인\t2.01T
+캐시 획득\t$1.23B
+획득한 셀\t12.5K
+다시 뽑기 파편 획득함\t3.2K
+전투
+입힌 대미지\t1.23S
+받은 대미지\t45.6B
+장벽이 받은 대미지\t12.3B
+생명력 흡수\t1.2M
+죽음 저항\t12
+투사체 대미지\t123.4q
+가시 대미지\t45.6q
+오브 대미지\t789.1Q
+지뢰 대미지\t12.3q
+죽음의 광선 대미지\t4.5q
+유틸리티
+회복 패키지\t321
+황금 타워로 획득한 캐시\t$12.3M
+황금 타워로 획득한 코인\t1.2T
+블랙홀로 획득한 코인\t345.6B
+코인 업그레이드로 얻은 코인\t98.7B
+적 파괴
+적 합계\t123,456
+기본\t98,765
+신속\t12,345
+탱킹\t6,789
+원거리\t4,321
+보스\t512
+수호자\t64
+총 엘리트\t300
+뱀파이어\t100
+광선\t100
+스캐터\t100
+봇
+불꽃 봇 대미지\t12.3q
+천둥 봇 기절\t1,234
+가디언
+대미지\t1.2q
+보석\t12
+메달\t3
+대포 파편\t4
+""",
+    'en': """Battle Report
+Battle Date\tOct 14, 2024 13:45
+Game Time\t1d 2h 3m 4s
+Real Time\t5h 6m 7s
+Tier\t11
+Wave\t5,123
+Killed By\tScatter
+Coins earned\t12.34T
+Coins per hour\t2.01T
+Cash earned\t$1.23B
+Cells Earned\t12.5K
+Reroll Shards Earned\t3.2K
+Combat
+Damage dealt\t1.23S
+Damage Taken\t45.6B
+Damage Taken Wall\t12.3B
+Lifesteal\t1.2M
+Death Defy\t12
+Projectiles Damage\t123.4q
+Thorn damage\t45.6q
+Orb Damage\t789.1Q
+Land Mine Damage\t12.3q
+Death Ray Damage\t4.5q
+Utility
+Recovery Packages\t321
+Cash From Golden Tower\t$12.3M
+Coins From Golden Tower\t1.2T
+Coins From Black Hole\t345.6B
+Coins from Coin Upgrade\t98.7B
+Enemies Destroyed
+Total Enemies\t123,456
+Basic\t98,765
+Fast\t12,345
+Tank\t6,789
+Ranged\t4,321
+Boss\t512
+Protector\t64
+Total Elites\t300
+Vampires\t100
+Rays\t100
+Scatters\t100
+Bots
+Flame Bot Damage\t12.3q
+Thunder Bot Stuns\t1,234
+Guardian
+Damage\t1.2q
+Gems\t12
+Medals\t3
+Cannon Shards\t4
+""",
+}
+
+def parsed_without_locale(text: str) -> dict:
+    parsed = parse_battle_report(text)
+    parsed.pop('locale')
+    return parsed
+
+def main():
+    # 언어가 달라도 같은 전투면 저장되는 내용이 같아야 함 (키/처치자/시간 표기 통일)
+    assert parsed_without_locale(SAMPLES['ko']) == parsed_without_locale(SAMPLES['en'])
+
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    for code, text in SAMPLES.items():
+        lines = text.split('\n')
+        detect = timeit.timeit(lambda: detect_grammar(lines), number=number)
+        parse = timeit.timeit(lambda: parse_battle_report(text), number=number)
+        parsed = parse_battle_report(text)
+        assert parsed['locale'] == code
+        print(
+            f"[{code}] detect {detect / number * 1e6:7.1f} us | "
+            f"parse {parse / number * 1e6:7.1f} us | "
+            f"{sum(len(v) for v in parsed['detail'].values())} metrics, "
+            f"{parsed['main']['battle_date']:%Y-%m-%d %H:%M}"
+        )
+
+if __name__ == "__main__":
+    main()
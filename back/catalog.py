@@ -0,0 +1,53 @@
+# back/catalog.py
+# 게임 데이터 카탈로그 (game_data/*.json)
+# - 부팅 시 한 번 읽어서 변경 불가 구조(MappingProxyType / tuple)로 보관 -> 계산기/검증 코드가 같은 데이터를 사용
+# - 섹션(파일)마다 응답 본문과 내용 해시를 미리 만들어 두고, 해시가 들어간 URL 로 내려줌
+#   (내용이 바뀌면 URL 이 바뀌므로 클라이언트는 무기한 캐시해도 됨)
+import hashlib
+import json
+from pathlib import Path
+from types import MappingProxyType
+
+GAME_DATA_DIR = Path(__file__).parent / "game_data"
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+class CatalogSection:
+    def __init__(self, name: str, raw: dict):
+        self.name = name
+        self.data = _freeze(raw)
+        self.body = json.dumps(raw, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.hash = hashlib.sha256(self.body).hexdigest()[:16]
+        self.etag = f'"{self.hash}"'
+
+def _load_sections() -> dict:
+    sections = {}
+    for path in sorted(GAME_DATA_DIR.glob("*.json")):
+        with open(path, encoding="utf-8") as f:
+            sections[path.stem] = CatalogSection(path.stem, json.load(f))
+    return sections
+
+SECTIONS = _load_sections()
+
+# 전체 버전 = 섹션 해시들의 해시 (매니페스트 ETag)
+VERSION = hashlib.sha256(
+    "".join(f"{name}:{s.hash};" for name, s in SECTIONS.items()).encode()
+).hexdigest()[:16]
+
+def get(name: str):
+    """섹션 데이터 (읽기 전용). 없는 섹션이면 KeyError"""
+    return SECTIONS[name].data
+
+def manifest(url_prefix: str) -> dict:
+    return {
+        "version": VERSION,
+        "sections": {
+            name: {"hash": s.hash, "url": f"{url_prefix}/{name}/{s.hash}", "bytes": len(s.body)}
+            for name, s in SECTIONS.items()
+        },
+    }
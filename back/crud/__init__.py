@@ -7,20 +7,58 @@ from .user import (
 # [Report 관련] 
 from .report import (
     create_battle_record,
+    get_report_by_hash,
+    update_report_notes,
     count_reports,
     get_recent_reports,
     get_history_reports,
     get_full_report,
+    get_full_reports,
     delete_battle_record,
+    bulk_delete_reports,
     get_history_view,       
-    get_reports_by_month    
+    get_reports_by_month,
+    query_reports,
+    search_reports
+)
+
+# [Archive 관련]
+from .archive import (
+    archive_old_details
+)
+
+# [Metric 검색 관련]
+from .metrics import (
+    get_metric_names,
+    query_metric
+)
+
+# [Run Stats 관련]
+from .run_stats import (
+    compare_runs,
+    rebuild_run_stats
+)
+
+# [Sync 관련]
+from .sync import (
+    get_current_version,
+    get_changes_since
 )
 
 # [Stats 관련]
 from .stats import (
+    get_bucketed_stats,
     get_weekly_stats,
     get_weekly_trends
 )
 
+# [Leaderboard 관련]
+from .leaderboard import (
+    refresh_tier_aggregates,
+    refresh_tier_aggregates_if_stale,
+    get_tier_leaderboard,
+    get_run_percentile
+)
+
 # [Game Data 관련]
 from .game_data import *
\ No newline at end of file
@@ -0,0 +1,225 @@
+# back/crud/archive.py
+# 오래된 BattleDetail 을 유저별/월별 zstd 압축 묶음(battle_detail_archives)으로 옮기는 콜드 티어
+# 보관 형식: {battle_date ISO 문자열: {"metric_ids": [...], "metric_values": [...], "metric_texts": [...]}}
+import json
+import os
+from datetime import datetime, timedelta, timezone
+import zstandard
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+from models import BattleMain, BattleDetail, BattleDetailArchive
+import detail_codec
+
+DETAIL_ARCHIVE_AFTER_DAYS = int(os.getenv("DETAIL_ARCHIVE_AFTER_DAYS", 90))
+ARCHIVE_LOCK_KEY = 7402003
+
+_compressor = zstandard.ZstdCompressor(level=10)
+_decompressor = zstandard.ZstdDecompressor()
+
+class ArchivedDetail:
+    """압축 묶음에서 꺼낸 상세 데이터 - BattleDetail 과 같은 방식으로 decode_detail() 에 넘길 수 있음"""
+    combat_json = utility_json = enemy_json = bot_json = None
+
+    def __init__(self, db: Session, packed: dict):
+        self._db = db
+        self.metric_ids = packed["metric_ids"]
+        self.metric_values = packed["metric_values"]
+        self.metric_texts = packed["metric_texts"]
+
+    def section(self, column: str) -> dict:
+        return detail_codec.decode_detail(self._db, self, [column])[column]
+
+def _pack(entries: dict) -> bytes:
+    return _compressor.compress(json.dumps(entries, ensure_ascii=False).encode("utf-8"))
+
+def _unpack(payload: bytes) -> dict:
+    return json.loads(_decompressor.decompress(payload))
+
+def _month_key(battle_date: datetime) -> str:
+    return battle_date.strftime("%Y-%m")
+
+def _packed_columns(detail: BattleDetail) -> dict:
+    if detail.metric_ids is not None:
+        return {
+            "metric_ids": detail.metric_ids,
+            "metric_values": detail.metric_values,
+            "metric_texts": detail.metric_texts,
+        }
+    # 아직 JSONB 형식인 행은 보관하면서 같이 변환
+    return detail_codec.encode_detail({
+        "combat_json": detail.combat_json,
+        "utility_json": detail.utility_json,
+        "enemy_json": detail.enemy_json,
+        "bot_json": detail.bot_json,
+    })
+
+def _lock_user(db: Session, user_id: int, wait: bool = True) -> bool:
+    fn = "pg_advisory_xact_lock" if wait else "pg_try_advisory_xact_lock"
+    result = db.execute(
+        text(f"SELECT {fn}(:key, :user_id)"), {"key": ARCHIVE_LOCK_KEY, "user_id": user_id}
+    ).scalar()
+    return wait or bool(result)
+
+def archive_old_details(db: Session, older_than_days: int = DETAIL_ARCHIVE_AFTER_DAYS, max_groups: int = 200) -> int:
+    """cutoff 이전 상세 데이터를 (유저, 월) 단위로 압축 보관. 옮긴 행 수를 반환."""
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=older_than_days)
+    month_expr = func.to_char(BattleMain.battle_date, 'YYYY-MM')
+
+    groups = (
+        db.query(BattleMain.owner_id, month_expr.label('month_key'))
+        .join(BattleDetail, BattleDetail.battle_date == BattleMain.battle_date)
+        .filter(BattleMain.battle_date < cutoff)
+        .group_by(BattleMain.owner_id, month_expr)
+        .limit(max_groups)
+        .all()
+    )
+
+    moved = 0
+    for owner_id, month_key in groups:
+        # 같은 유저의 묶음을 다른 워커(보관 작업/삭제)가 동시에 고치지 않도록 유저 단위 잠금
+        if not _lock_user(db, owner_id, wait=False):
+            db.rollback()
+            continue
+
+        archive = (
+            db.query(BattleDetailArchive)
+            .filter(
+                BattleDetailArchive.owner_id == owner_id,
+                BattleDetailArchive.month_key == month_key
+            )
+            .first()
+        )
+
+        details = (
+            db.query(BattleDetail)
+            .join(BattleMain, BattleMain.battle_date == BattleDetail.battle_date)
+            .filter(
+                BattleMain.owner_id == owner_id,
+                month_expr == month_key,
+                BattleMain.battle_date < cutoff
+            )
+            .all()
+        )
+        if not details:
+            db.rollback()
+            continue
+
+        entries = _unpack(archive.payload) if archive else {}
+        for detail in details:
+            entries[detail.battle_date.isoformat()] = _packed_columns(detail)
+
+        if not archive:
+            archive = BattleDetailArchive(owner_id=owner_id, month_key=month_key)
+            db.add(archive)
+        archive.payload = _pack(entries)
+        archive.report_count = len(entries)
+        archive.archived_at = datetime.now(timezone.utc)
+
+        for detail in details:
+            db.delete(detail)
+
+        db.commit()
+        moved += len(details)
+
+    return moved
+
+def load_archived_details(db: Session, user_id: int, battle_dates) -> dict:
+    """battle_date -> ArchivedDetail. 월별 묶음 하나당 한 번만 압축을 풉니다."""
+    months = {_month_key(d) for d in battle_dates}
+    if not months:
+        return {}
+
+    archives = (
+        db.query(BattleDetailArchive)
+        .filter(
+            BattleDetailArchive.owner_id == user_id,
+            BattleDetailArchive.month_key.in_(months)
+        )
+        .all()
+    )
+
+    entries = {}
+    for archive in archives:
+        entries.update(_unpack(archive.payload))
+
+    result = {}
+    for battle_date in battle_dates:
+        packed = entries.get(battle_date.isoformat())
+        if packed:
+            result[battle_date] = ArchivedDetail(db, packed)
+    return result
+
+def attach_archived_details(db: Session, user_id: int, reports):
+    """목록 조회 결과 중 상세가 보관된 행에 archived_detail 을 붙임 (top_damages 계산용)"""
+    missing = [r.battle_date for r in reports if r.detail is None]
+    if not missing:
+        return reports
+
+    archived = load_archived_details(db, user_id, missing)
+    for report in reports:
+        if report.battle_date in archived:
+            report.archived_detail = archived[report.battle_date]
+    return reports
+
+def remove_archived_entries(db: Session, user_id: int, battle_dates):
+    """삭제된 기록을 압축 묶음에서도 제거 (커밋은 호출한 쪽에서)"""
+    by_month = {}
+    for battle_date in battle_dates:
+        by_month.setdefault(_month_key(battle_date), set()).add(battle_date.isoformat())
+    if not by_month:
+        return
+
+    _lock_user(db, user_id)
+    archives = (
+        db.query(BattleDetailArchive)
+        .filter(
+            BattleDetailArchive.owner_id == user_id,
+            BattleDetailArchive.month_key.in_(list(by_month))
+        )
+        .all()
+    )
+
+    for archive in archives:
+        entries = _unpack(archive.payload)
+        remaining = {k: v for k, v in entries.items() if k not in by_month[archive.month_key]}
+        if len(remaining) == len(entries):
+            continue
+        if remaining:
+            archive.payload = _pack(remaining)
+            archive.report_count = len(remaining)
+        else:
+            db.delete(archive)
+
+def remove_archived_range(db: Session, user_id: int, start_date: datetime = None, end_date: datetime = None):
+    """[start_date, end_date) 구간 기록을 압축 묶음에서 제거. 구간이 통째로 덮는 달은 묶음째 삭제 (커밋은 호출한 쪽에서)"""
+    _lock_user(db, user_id)
+    query = db.query(BattleDetailArchive).filter(BattleDetailArchive.owner_id == user_id)
+    if start_date is None and end_date is None:
+        query.delete(synchronize_session=False)
+        return
+
+    if start_date:
+        query = query.filter(BattleDetailArchive.month_key >= _month_key(start_date))
+    if end_date:
+        query = query.filter(BattleDetailArchive.month_key <= _month_key(end_date - timedelta(microseconds=1)))
+
+    for archive in query.all():
+        month_start = datetime.strptime(f"{archive.month_key}-01", "%Y-%m-%d")
+        month_end = (month_start + timedelta(days=32)).replace(day=1)
+        if (start_date is None or start_date <= month_start) and (end_date is None or month_end <= end_date):
+            db.delete(archive)
+            continue
+
+        entries = _unpack(archive.payload)
+        remaining = {
+            k: v for k, v in entries.items()
+            if not ((start_date is None or datetime.fromisoformat(k) >= start_date)
+                    and (end_date is None or datetime.fromisoformat(k) < end_date))
+        }
+        if len(remaining) == len(entries):
+            continue
+        if remaining:
+            archive.payload = _pack(remaining)
+            archive.report_count = len(remaining)
+        else:
+            db.delete(archive)
@@ -0,0 +1,139 @@
+# back/crud/leaderboard.py
+# 티어별 리더보드 / 백분위 (머티리얼라이즈드 뷰 tier_user_bests, tier_percentiles 기반)
+import os
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+LEADERBOARD_REFRESH_SECONDS = int(os.getenv("LEADERBOARD_REFRESH_SECONDS", 300))
+REFRESH_LOCK_KEY = 7402002
+
+# 정렬 기준 -> 뷰 컬럼 (사용자 입력을 SQL에 직접 넣지 않기 위한 화이트리스트)
+LEADERBOARD_METRICS = {
+    "wave": "best_wave",
+    "coins_per_hour": "best_coins_per_hour",
+}
+
+_last_refresh = 0.0
+
+def refresh_tier_aggregates(db: Session) -> bool:
+    """두 뷰를 CONCURRENTLY 갱신 (읽기를 막지 않음). 다른 워커가 갱신 중이면 건너뜀."""
+    global _last_refresh
+    locked = db.execute(
+        text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": REFRESH_LOCK_KEY}
+    ).scalar()
+    if not locked:
+        # 다른 워커가 갱신 중 -> 이번 주기는 끝난 것으로 보고, 이 워커의 인제스트마다 잠금을 다시 시도하지 않음
+        db.rollback()
+        _last_refresh = time.monotonic()
+        return False
+
+    db.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY tier_user_bests"))
+    db.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY tier_percentiles"))
+    db.commit()
+    _last_refresh = time.monotonic()
+    return True
+
+def refresh_tier_aggregates_if_stale():
+    """BackgroundTasks 용 - 요청 세션이 닫힌 뒤에 실행되므로 세션을 직접 엽니다."""
+    if time.monotonic() - _last_refresh < LEADERBOARD_REFRESH_SECONDS:
+        return
+
+    from database import SessionLocal
+    db = SessionLocal()
+    try:
+        refresh_tier_aggregates(db)
+    except Exception as e:
+        print(f"[Leaderboard] Refresh Error: {e}")
+    finally:
+        db.close()
+
+def get_tier_leaderboard(db: Session, tier: str, user_id: int, metric: str = "wave", limit: int = 50):
+    column = LEADERBOARD_METRICS[metric]
+
+    rows = db.execute(
+        text(f"""
+            SELECT username, {column} AS value, runs
+            FROM tier_user_bests
+            WHERE tier = :tier
+            ORDER BY {column} DESC
+            LIMIT :limit
+        """),
+        {"tier": tier, "limit": limit}
+    ).all()
+
+    # 내 순위 = 나보다 높은 유저 수 + 1 (인덱스 범위 카운트)
+    mine = db.execute(
+        text(f"""
+            SELECT me.{column} AS value,
+                   (SELECT count(*) FROM tier_user_bests o
+                    WHERE o.tier = me.tier AND o.{column} > me.{column}) + 1 AS rank
+            FROM tier_user_bests me
+            WHERE me.tier = :tier AND me.owner_id = :user_id
+        """),
+        {"tier": tier, "user_id": user_id}
+    ).first()
+
+    entries = []
+    for i, row in enumerate(rows):
+        entries.append({
+            "rank": i + 1,
+            "username": row.username,
+            "value": row.value or 0,
+            "runs": row.runs
+        })
+
+    return {
+        "tier": tier,
+        "metric": metric,
+        "entries": entries,
+        "my_rank": mine.rank if mine else None,
+        "my_best": mine.value if mine else None
+    }
+
+def percentile_from_cuts(cuts, value) -> float:
+    """
+    1% 간격 컷 배열에서 value의 백분위를 선형 보간으로 추정.
+    최고 컷 이상이면 100 (모두 같은 값인 티어의 최고 기록 포함), 컷과 같은 값이 여러 개면 그 구간의 가운데 (mid-rank)
+    """
+    if not cuts or value is None:
+        return 0.0
+    if value >= cuts[-1]:
+        return 100.0
+    if value < cuts[0]:
+        return 0.0
+
+    step = 100 / (len(cuts) - 1)
+    i = bisect_left(cuts, value)
+    ties = bisect_right(cuts, value) - i
+    if ties:
+        return round((i + (ties - 1) / 2) * step, 1)
+
+    lo, hi = cuts[i - 1], cuts[i]
+    frac = (value - lo) / (hi - lo)
+    return round((i - 1 + frac) * step, 1)
+
+def get_run_percentile(db: Session, battle_date: datetime, user_id: int):
+    # PK 조회 + tier 유니크 인덱스 조회 한 번으로 끝
+    row = db.execute(
+        text("""
+            SELECT m.tier, m.wave, m.coins_per_hour,
+                   p.runs, p.wave_cuts, p.cph_cuts
+            FROM battle_mains m
+            LEFT JOIN tier_percentiles p ON p.tier = m.tier
+            WHERE m.battle_date = :battle_date AND m.owner_id = :user_id
+        """),
+        {"battle_date": battle_date, "user_id": user_id}
+    ).first()
+
+    if not row:
+        return None
+
+    return {
+        "tier": row.tier,
+        "runs": row.runs or 0,
+        "wave_percentile": percentile_from_cuts(row.wave_cuts, row.wave),
+        "coins_per_hour_percentile": percentile_from_cuts(row.cph_cuts, row.coins_per_hour)
+    }
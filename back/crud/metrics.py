@@ -0,0 +1,98 @@
+# back/crud/metrics.py
+# 상세 지표 검색 (battle_metrics) - "오브 대미지가 입힌 대미지의 30% 이상인 판", "T12 연쇄 번개 대미지 최고 판" 등
+# (owner_id, metric_id, value) 인덱스로 한 지표의 범위 조회/정렬이 인덱스 안에서 끝남
+from sqlalchemy import Float, and_, delete, func, literal
+from sqlalchemy.orm import Session, aliased
+from models import BattleMain, BattleMetric
+import detail_codec
+
+def replace_run_metrics(db: Session, user_id: int, battle_date, encoded: dict):
+    """encode_detail() 결과 중 숫자인 값만 battle_metrics 에 저장 (같은 판을 다시 올리면 교체). 커밋은 호출한 쪽에서"""
+    # Core DELETE/INSERT 만 사용 (create_battle_record 의 쓰기 파이프라인 안에서 실행됨)
+    db.execute(delete(BattleMetric).where(BattleMetric.battle_date == battle_date))
+
+    rows = [
+        {"battle_date": battle_date, "metric_id": metric_id, "owner_id": user_id, "value": value}
+        for metric_id, value in zip(encoded["metric_ids"], encoded["metric_values"])
+        if value is not None
+    ]
+    if rows:
+        db.execute(BattleMetric.__table__.insert(), rows)
+
+def get_metric_names(db: Session, user_id: int) -> dict:
+    """내 기록에 숫자값이 있는 지표 이름 (섹션별)"""
+    metric_ids = (
+        db.query(BattleMetric.metric_id)
+        .filter(BattleMetric.owner_id == user_id)
+        .distinct()
+        .all()
+    )
+
+    names = {section: [] for section in detail_codec.SECTION_COLUMNS}
+    for (metric_id,) in metric_ids:
+        section, name = detail_codec.metric_key(db, metric_id)
+        if section in names:
+            names[section].append(name)
+    for section in names:
+        names[section].sort()
+    return names
+
+def query_metric(
+    db: Session,
+    user_id: int,
+    section: str,
+    metric: str,
+    ratio_to: str = None,
+    tier: str = None,
+    min_value: float = None,
+    max_value: float = None,
+    order: str = "desc",
+    limit: int = 50
+):
+    """
+    한 지표로 내 기록을 거르고 정렬. ratio_to 를 주면 (metric / ratio_to) 비율 기준 (0.3 = 30%).
+    없는 지표 이름이면 None.
+    """
+    metric_id = detail_codec.lookup_metric_id(db, section, metric)
+    if metric_id is None:
+        return None
+
+    m = aliased(BattleMetric)
+    base = aliased(BattleMetric)
+
+    if ratio_to:
+        base_id = detail_codec.lookup_metric_id(db, section, ratio_to)
+        if base_id is None:
+            return None
+        value_expr = m.value / func.nullif(base.value, 0, type_=Float)
+        base_column = base.value
+    else:
+        value_expr = m.value
+        base_column = literal(None)
+
+    query = (
+        db.query(
+            BattleMain.battle_date,
+            BattleMain.tier,
+            BattleMain.wave,
+            m.value.label("metric_value"),
+            base_column.label("base_value"),
+            value_expr.label("value"),
+        )
+        .select_from(m)
+        .join(BattleMain, BattleMain.battle_date == m.battle_date)
+        .filter(m.owner_id == user_id, m.metric_id == metric_id)
+    )
+    if ratio_to:
+        query = query.join(base, and_(base.battle_date == m.battle_date, base.metric_id == base_id))
+
+    if tier:
+        query = query.filter(BattleMain.tier == tier)
+    if min_value is not None:
+        query = query.filter(value_expr >= min_value)
+    if max_value is not None:
+        query = query.filter(value_expr <= max_value)
+
+    ordering = value_expr.asc().nulls_last() if order == "asc" else value_expr.desc().nulls_last()
+    rows = query.order_by(ordering, BattleMain.battle_date.desc()).limit(limit).all()
+    return [dict(row._mapping) for row in rows]
@@ -1,27 +1,108 @@
 # back/crud/report.py
 from sqlalchemy.orm import Session, joinedload, load_only
-from sqlalchemy import func
-from models import BattleMain, BattleDetail
+from sqlalchemy import func, or_, text
+from sqlalchemy.dialects.postgresql import insert
+from models import BattleMain, BattleDetail, ReportChange
 from datetime import datetime, timedelta, timezone
+import detail_codec
+from database import write_pipeline
+from .archive import load_archived_details, attach_archived_details, remove_archived_entries, remove_archived_range
+from .run_stats import record_run, forget_run, forget_runs, forget_all_runs, compare_runs
+from .metrics import replace_run_metrics
 
-def create_battle_record(db: Session, parsed_data: dict, user_id: int, notes: str = None):
+# 변경 로그 버전(report_changes.id) 할당을 유저 단위로 직렬화하는 advisory lock 키
+# bigserial 은 INSERT 시점에 번호를 받으므로, 잠금 없이 두 트랜잭션이 겹치면 작은 번호가 나중에 커밋될 수 있고
+# 그 사이에 since 를 올린 클라이언트는 그 변경을 영영 못 받음. 잠금은 커밋까지 유지되므로 번호 순서 = 커밋 순서
+CHANGE_LOG_LOCK_KEY = 7402005
+
+def lock_change_log(db: Session, user_id: int):
+    db.execute(text("SELECT pg_advisory_xact_lock(:key, :user_id)"), {"key": CHANGE_LOG_LOCK_KEY, "user_id": user_id})
+
+# 목록 조회용 (top_damages 계산에 필요한 컬럼만)
+LIGHT_DETAIL_COLUMNS = (
+    BattleDetail.combat_json,
+    BattleDetail.metric_ids,
+    BattleDetail.metric_values,
+    BattleDetail.metric_texts,
+)
+
+def create_battle_record(db: Session, parsed_data: dict, user_id: int, notes: str = None, content_hash: str = None):
     main_data = parsed_data['main']
     detail_data = parsed_data['detail']
     
     if notes:
         main_data['notes'] = notes
+    if content_hash:
+        main_data['content_hash'] = content_hash
 
-    battle_main = BattleMain(**main_data, owner_id=user_id)
-    battle_detail = BattleDetail(
-        battle_date=battle_main.battle_date,
-        **detail_data
-    )
+    main_values = {**main_data, "owner_id": user_id}
+    battle_main = BattleMain(**main_values)
+    encoded = detail_codec.encode_detail(detail_data)
+    detail_values = {
+        "battle_date": battle_main.battle_date,
+        "combat_json": None,
+        "utility_json": None,
+        "enemy_json": None,
+        "bot_json": None,
+        **encoded
+    }
     
-    db.merge(battle_main)
-    db.merge(battle_detail)
+    # 파이프라인 밖에서 먼저 잠금 (결과를 기다려야 하는 문장)
+    lock_change_log(db, user_id)
+
+    # 같은 battle_date 를 덮어쓰는 경우 이전 값은 누적 통계에서 먼저 뺌
+    previous = db.get(BattleMain, battle_main.battle_date)
+    if previous:
+        forget_run(db, previous)
+    comparison = record_run(db, battle_main)
+    db.flush()
+
+    # merge(SELECT 후 INSERT/UPDATE) 대신 ON CONFLICT 업서트 - 나머지 쓰기와 함께 파이프라인으로 한 번에 전송
+    main_stmt = insert(BattleMain).values(main_values)
+    detail_stmt = insert(BattleDetail).values(detail_values)
+    with write_pipeline(db):
+        db.execute(main_stmt.on_conflict_do_update(
+            index_elements=[BattleMain.battle_date],
+            set_={key: main_stmt.excluded[key] for key in main_values if key != "battle_date"}
+        ))
+        db.execute(detail_stmt.on_conflict_do_update(
+            index_elements=[BattleDetail.battle_date],
+            set_={key: detail_stmt.excluded[key] for key in detail_values if key != "battle_date"}
+        ))
+        replace_run_metrics(db, user_id, battle_main.battle_date, encoded)
+        # inline(): 생성된 id 를 RETURNING 으로 받지 않음 (파이프라인 안에서는 결과를 읽을 수 없음)
+        db.execute(insert(ReportChange).values(owner_id=user_id, battle_date=battle_main.battle_date, op="upsert").inline())
     db.commit()
+
+    battle_main.comparison = comparison
     return battle_main
 
+# 같은 원문을 이미 제출했는지 확인 (owner_id + content_hash 인덱스 조회)
+def get_report_by_hash(db: Session, user_id: int, content_hash: str):
+    report = (
+        db.query(BattleMain)
+        .options(
+            joinedload(BattleMain.detail).load_only(*LIGHT_DETAIL_COLUMNS)
+        )
+        .filter(
+            BattleMain.owner_id == user_id,
+            BattleMain.content_hash == content_hash
+        )
+        .first()
+    )
+    if report:
+        attach_archived_details(db, user_id, [report])
+        compare_runs(db, user_id, [report])
+    return report
+
+# 중복 제출에 새 메모가 붙어 온 경우: 기록은 그대로 두고 메모만 갱신 (동기화 클라이언트도 받도록 변경 로그 기록)
+def update_report_notes(db: Session, report: BattleMain, notes: str, user_id: int):
+    lock_change_log(db, user_id)
+    report.notes = notes
+    db.add(ReportChange(owner_id=user_id, battle_date=report.battle_date, op="upsert"))
+    db.commit()
+    return report
+
 def count_reports(db: Session) -> int:
     return db.query(BattleMain).count()
 
@@ -37,7 +118,7 @@ def get_recent_reports(db: Session, user_id: int):
     return (
         db.query(BattleMain)
         .options(
-            joinedload(BattleMain.detail).load_only(BattleDetail.combat_json)
+            joinedload(BattleMain.detail).load_only(*LIGHT_DETAIL_COLUMNS)
         )
         .filter(BattleMain.owner_id == user_id)
         .filter(BattleMain.battle_date >= cutoff_date_naive)
@@ -46,16 +127,17 @@ def get_recent_reports(db: Session, user_id: int):
     )
 
 def get_history_reports(db: Session, user_id: int, skip: int = 0, limit: int = 100):
-    return (
+    reports = (
         db.query(BattleMain)
         .options(
-            joinedload(BattleMain.detail).load_only(BattleDetail.combat_json)
+            joinedload(BattleMain.detail).load_only(*LIGHT_DETAIL_COLUMNS)
         )
         .filter(BattleMain.owner_id == user_id)
         .order_by(BattleMain.battle_date.desc())
         .offset(skip).limit(limit)
         .all()
     )
+    return attach_archived_details(db, user_id, reports)
 
 # 기록실 최적화 뷰 (최근 7일 상세 + 나머지 월별 요약)
 def get_history_view(db: Session, user_id: int):
@@ -67,7 +149,7 @@ def get_history_view(db: Session, user_id: int):
     recent_reports = (
         db.query(BattleMain)
         .options(
-            joinedload(BattleMain.detail).load_only(BattleDetail.combat_json)
+            joinedload(BattleMain.detail).load_only(*LIGHT_DETAIL_COLUMNS)
         )
         .filter(BattleMain.owner_id == user_id)
         .filter(BattleMain.battle_date >= cutoff_date)
@@ -76,9 +158,12 @@ def get_history_view(db: Session, user_id: int):
     )
 
     # 2. 7일 이전 데이터 월별 요약 (Monthly Aggregation)
+    # 같은 식 객체를 재사용해야 SELECT/GROUP BY 의 'YYYY-MM' 이 같은 바인드 파라미터가 됨
+    # (서버측 바인딩에서는 $1, $2 로 따로 보내면 같은 식으로 인식하지 못함)
+    month_expr = func.to_char(BattleMain.battle_date, 'YYYY-MM')
     monthly_groups = (
         db.query(
-            func.to_char(BattleMain.battle_date, 'YYYY-MM').label('month_key'),
+            month_expr.label('month_key'),
             func.count(BattleMain.battle_date).label('count'),
             func.sum(BattleMain.coin_earned).label('total_coins'),
             func.sum(BattleMain.cells_earned).label('total_cells'),
@@ -88,12 +173,8 @@ def get_history_view(db: Session, user_id: int):
             BattleMain.owner_id == user_id,
             BattleMain.battle_date < cutoff_date
         )
-        .group_by(
-            func.to_char(BattleMain.battle_date, 'YYYY-MM')
-        )
-        .order_by(
-            func.to_char(BattleMain.battle_date, 'YYYY-MM').desc()
-        )
+        .group_by(month_expr)
+        .order_by(month_expr.desc())
         .all()
     )
 
@@ -122,10 +203,10 @@ def get_reports_by_month(db: Session, user_id: int, month_key: str):
     # 다음 달 1일 계산
     end_date = (start_date + timedelta(days=32)).replace(day=1)
 
-    return (
+    reports = (
         db.query(BattleMain)
         .options(
-            joinedload(BattleMain.detail).load_only(BattleDetail.combat_json)
+            joinedload(BattleMain.detail).load_only(*LIGHT_DETAIL_COLUMNS)
         )
         .filter(
             BattleMain.owner_id == user_id,
@@ -135,11 +216,125 @@ def get_reports_by_month(db: Session, user_id: int, month_key: str):
         .order_by(BattleMain.battle_date.desc())
         .all()
     )
+    # 오래된 달은 상세가 콜드 티어에 있으므로 월 묶음 하나를 풀어서 붙임
+    return attach_archived_details(db, user_id, reports)
+
+# 정렬 기준 화이트리스트 (API 파라미터 -> 컬럼). battle_date 외에는 모두 부분 인덱스 idx_owner_*_nn 가 있음
+QUERY_SORT_COLUMNS = {
+    "battle_date": BattleMain.battle_date,
+    "wave": BattleMain.wave,
+    "coins_per_hour": BattleMain.coins_per_hour,
+    "real_time": BattleMain.real_time_seconds,
+    "damage_dealt": BattleMain.damage_dealt_value,
+}
+
+# 조건 검색 (필터 + 정렬을 DB에서 처리, 일치하는 행만 반환)
+def query_reports(
+    db: Session,
+    user_id: int,
+    tier: str = None,
+    min_wave: int = None,
+    max_wave: int = None,
+    killer: str = None,
+    start_date: datetime = None,
+    end_date: datetime = None,
+    sort: str = "battle_date",
+    order: str = "desc",
+    skip: int = 0,
+    limit: int = 50
+):
+    query = (
+        db.query(BattleMain)
+        .options(
+            joinedload(BattleMain.detail).load_only(*LIGHT_DETAIL_COLUMNS)
+        )
+        .filter(BattleMain.owner_id == user_id)
+    )
+
+    if tier:
+        query = query.filter(BattleMain.tier == tier)
+    if min_wave is not None:
+        query = query.filter(BattleMain.wave >= min_wave)
+    if max_wave is not None:
+        query = query.filter(BattleMain.wave <= max_wave)
+    if killer:
+        query = query.filter(BattleMain.killer == killer)
+    if start_date:
+        query = query.filter(BattleMain.battle_date >= start_date)
+    if end_date:
+        query = query.filter(BattleMain.battle_date < end_date)
+
+    # 값이 없는(해석 못 한) 기록은 정렬 대상에서 빼서 asc 에서도 앞에 오지 않게 함 -> 부분 인덱스 idx_owner_*_nn 사용
+    # (desc = 인덱스를 거꾸로, asc = 앞으로 읽음. 같은 값끼리는 battle_date 도 같은 방향)
+    column = QUERY_SORT_COLUMNS[sort]
+    if sort != "battle_date":
+        query = query.filter(column.isnot(None))
+    if order == "asc":
+        ordering = [column.asc()] if sort == "battle_date" else [column.asc(), BattleMain.battle_date.asc()]
+    else:
+        ordering = [column.desc()] if sort == "battle_date" else [column.desc(), BattleMain.battle_date.desc()]
+
+    reports = (
+        query
+        .order_by(*ordering)
+        .offset(skip).limit(limit)
+        .all()
+    )
+    return attach_archived_details(db, user_id, reports)
+
+def _escape_like(keyword: str) -> str:
+    return keyword.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+# 메모/처치자 검색 (트라이그램 인덱스 + battle_date 키셋 페이지네이션)
+# pg_trgm 이 검색어에서 트라이그램을 뽑을 수 있는 최소 길이
+TRGM_MIN_LENGTH = 3
+
+def search_reports(db: Session, user_id: int, keyword: str, before: datetime = None, limit: int = 30):
+    pattern = f"%{_escape_like(keyword)}%"
+
+    # 3자 미만("보스", "오브")은 트라이그램이 없어 GIN 인덱스가 전체를 훑게 되므로,
+    # 인덱스가 없는 식(coalesce)으로 비교해서 idx_owner_date 로 이 유저 기록만 최신순으로 읽다가 limit 에서 멈춤
+    notes, killer = BattleMain.notes, BattleMain.killer
+    if len(keyword) < TRGM_MIN_LENGTH:
+        notes, killer = func.coalesce(notes, ''), func.coalesce(killer, '')
+
+    query = (
+        db.query(BattleMain)
+        .options(
+            joinedload(BattleMain.detail).load_only(*LIGHT_DETAIL_COLUMNS)
+        )
+        .filter(
+            BattleMain.owner_id == user_id,
+            or_(
+                notes.ilike(pattern, escape='\\'),
+                killer.ilike(pattern, escape='\\')
+            )
+        )
+    )
+    if before:
+        query = query.filter(BattleMain.battle_date < before)
+
+    reports = (
+        query
+        .order_by(BattleMain.battle_date.desc())
+        .limit(limit)
+        .all()
+    )
+    return attach_archived_details(db, user_id, reports)
+
+# 한 번에 불러올 수 있는 상세 기록 수 (비교 화면용)
+MAX_BATCH_REPORTS = 20
+
+def _detail_columns(sections=None):
+    """요청한 섹션의 JSONB 컬럼만 로드 (변환된 행은 metric 배열에서 해당 섹션만 디코딩)"""
+    wanted = sections or list(detail_codec.SECTION_COLUMNS.values())
+    extra = [getattr(BattleDetail, c) for c in wanted if c != "combat_json"]
+    return (*LIGHT_DETAIL_COLUMNS, *extra)
 
-def get_full_report(db: Session, battle_date: datetime, user_id: int):
+def get_full_report(db: Session, battle_date: datetime, user_id: int, sections=None):
     main = (
         db.query(BattleMain)
-        .options(joinedload(BattleMain.detail))
+        .options(joinedload(BattleMain.detail).load_only(*_detail_columns(sections)))
         .filter(
             BattleMain.battle_date == battle_date,
             BattleMain.owner_id == user_id
@@ -149,12 +344,46 @@ def get_full_report(db: Session, battle_date: datetime, user_id: int):
     
     if not main:
         return None
+
+    detail = main.detail
+    if detail is None:
+        # 콜드 티어로 옮겨진 기록은 해당 월 묶음을 풀어서 읽음
+        detail = load_archived_details(db, user_id, [main.battle_date]).get(main.battle_date)
+        main.archived_detail = detail
+    compare_runs(db, user_id, [main])
         
     return {
         "main": main,
-        "detail": main.detail
+        "detail": detail_codec.decode_detail(db, detail, sections)
     }
 
+def get_full_reports(db: Session, battle_dates, user_id: int, sections=None):
+    """여러 기록의 상세를 한 번의 쿼리로 조회 (요청 순서 유지, 없는 기록은 제외)"""
+    mains = (
+        db.query(BattleMain)
+        .options(joinedload(BattleMain.detail).load_only(*_detail_columns(sections)))
+        .filter(
+            BattleMain.owner_id == user_id,
+            BattleMain.battle_date.in_(battle_dates)
+        )
+        .all()
+    )
+    by_date = {m.battle_date: m for m in mains}
+
+    # 보관된 기록은 월 묶음 단위로 한 번씩만 풀어서 붙임
+    attach_archived_details(db, user_id, mains)
+    compare_runs(db, user_id, mains)
+
+    reports = []
+    for battle_date in dict.fromkeys(battle_dates):
+        main = by_date.get(battle_date)
+        if main:
+            reports.append({
+                "main": main,
+                "detail": detail_codec.decode_detail(db, main.detail or main.archived_detail, sections)
+            })
+    return reports
+
 def delete_battle_record(db: Session, battle_date: datetime, user_id: int) -> bool:
     record = (
         db.query(BattleMain)
@@ -166,7 +395,62 @@ def delete_battle_record(db: Session, battle_date: datetime, user_id: int) -> bo
     )
 
     if record:
+        # bulk_delete_reports 와 같은 잠금 순서 (변경 로그 -> 보관 -> 행)
+        lock_change_log(db, user_id)
+        # 보관 후 다시 올린 기록은 상세가 양쪽에 있으므로 상세 유무와 상관없이 압축 묶음에서도 지움
+        remove_archived_entries(db, user_id, [record.battle_date])
+        forget_run(db, record)
         db.delete(record)
+        db.add(ReportChange(owner_id=user_id, battle_date=record.battle_date, op="delete"))
         db.commit()
         return True
-    return False
\ No newline at end of file
+    return False
+
+# 일괄 삭제: [start_date, end_date) 구간 (둘 다 None 이면 계정의 전체 기록)
+def bulk_delete_reports(db: Session, user_id: int, start_date: datetime = None, end_date: datetime = None) -> int:
+    """
+    ORM 으로 한 건씩 지우지 않고 집합 단위 DELETE 몇 번으로 처리 (한 트랜잭션).
+    콜드 티어 묶음 -> 상세 -> 본 기록(RETURNING 으로 변경 로그 기록) 순으로 지우고,
+    같은 트랜잭션에서 누적 통계(user_tier_stats)도 정리합니다. 지운 기록 수를 반환.
+    """
+    filters = ["owner_id = :user_id"]
+    params = {"user_id": user_id}
+    if start_date:
+        filters.append("battle_date >= :start_date")
+        params["start_date"] = start_date
+    if end_date:
+        filters.append("battle_date < :end_date")
+        params["end_date"] = end_date
+
+    # 잠금 순서는 create_battle_record 와 같게: 변경 로그 잠금 -> 보관 잠금 -> 행 잠금 (반대 순서면 교착)
+    lock_change_log(db, user_id)
+    # 압축 묶음 정리가 유저 단위 잠금을 먼저 잡으므로, 보관 작업이 도중에 상세를 옮기지 못함
+    remove_archived_range(db, user_id, start_date, end_date)
+
+    # battle_details 의 FK 에는 ON DELETE CASCADE 가 없으므로 상세부터 삭제
+    db.execute(text(f"""
+        DELETE FROM battle_details d
+        USING battle_mains m
+        WHERE d.battle_date = m.battle_date AND {" AND ".join("m." + f for f in filters)}
+    """), params)
+
+    deleted = db.execute(text(f"""
+        WITH deleted AS (
+            DELETE FROM battle_mains
+            WHERE {" AND ".join(filters)}
+            RETURNING battle_date, tier, wave, coin_earned, cells_earned, real_time_seconds
+        ),
+        logged AS (
+            INSERT INTO report_changes (owner_id, battle_date, op, changed_at)
+            SELECT :user_id, battle_date, 'delete', now() AT TIME ZONE 'utc' FROM deleted
+        )
+        SELECT tier, wave, coin_earned, cells_earned, real_time_seconds FROM deleted
+    """), params).all()
+
+    if start_date is None and end_date is None:
+        forget_all_runs(db, user_id)
+    else:
+        forget_runs(db, user_id, deleted)
+
+    db.commit()
+    return len(deleted)
@@ -0,0 +1,212 @@
+# back/crud/run_stats.py
+# 유저/티어별 "평소 기록" 누적 통계 - 제출/삭제 때마다 한 판 분량만 더하고 빼므로 전체 기록을 다시 읽지 않음
+# - 평균/분산: Welford 누적 (count, mean, m2), 빼기도 역산으로 처리
+# - 분위: 로그 구간 히스토그램 (SKETCH_GAMMA 배 간격, 상대 오차 약 1%) - 구간 수가 값 범위의 log 에 비례해 작음
+import math
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from models import BattleMain, UserTierStat
+
+SKETCH_GAMMA = 1.02
+ANOMALY_Z = 2.0          # |z| 가 이 이상이면 high/low 표시
+MIN_BASELINE_RUNS = 5    # 비교 대상 판 수가 이보다 적으면 표시하지 않음
+
+def run_metric_values(report) -> dict:
+    """BattleMain -> {지표: 값} (값이 없는 지표는 제외)"""
+    values = {}
+    if report.coin_earned is not None and report.real_time_seconds:
+        # 저장된 coins_per_hour 는 정수 반올림 값이라 원본에서 다시 계산
+        values["coins_per_hour"] = report.coin_earned * 3600 / report.real_time_seconds
+    if report.cells_earned is not None:
+        values["cells"] = report.cells_earned
+    if report.wave is not None:
+        values["wave"] = report.wave
+    if report.real_time_seconds:
+        values["real_time"] = report.real_time_seconds
+    return values
+
+def _bucket(value: float) -> str:
+    if value <= 0:
+        return "0"
+    return str(math.ceil(math.log(value, SKETCH_GAMMA)))
+
+def _bucket_order(key: str) -> float:
+    return -math.inf if key == "0" else int(key)
+
+def _without(count: int, mean: float, m2: float, value: float):
+    """Welford 누적에서 value 한 개를 뺀 (count, mean, m2)"""
+    if count <= 1:
+        return 0, 0.0, 0.0
+    new_mean = (count * mean - value) / (count - 1)
+    return count - 1, new_mean, max(m2 - (value - new_mean) * (value - mean), 0.0)
+
+def _apply(stat: UserTierStat, value: float, sign: int):
+    count, mean, m2 = stat.count or 0, stat.mean or 0.0, stat.m2 or 0.0
+    if sign > 0:
+        count += 1
+        delta = value - mean
+        mean += delta / count
+        m2 += delta * (value - mean)
+    else:
+        count, mean, m2 = _without(count, mean, m2, value)
+
+    sketch = dict(stat.sketch or {})
+    key = _bucket(value)
+    sketch[key] = sketch.get(key, 0) + sign
+    if sketch[key] <= 0:
+        del sketch[key]
+
+    # JSONB 는 새 dict 를 대입해야 변경으로 인식됨
+    stat.count, stat.mean, stat.m2, stat.sketch = count, mean, m2, sketch
+
+def _compare(stat: UserTierStat, value: float, included: bool) -> dict:
+    """stat 기준으로 value 를 비교. included=True 면 stat 에 이미 들어간 해당 판을 빼고 비교"""
+    count, mean, m2 = stat.count, stat.mean, stat.m2
+    sketch = stat.sketch or {}
+    key = _bucket(value)
+    same = sketch.get(key, 0)
+
+    if included:
+        count, mean, m2 = _without(count, mean, m2, value)
+        same = max(same - 1, 0)
+
+    if count < MIN_BASELINE_RUNS:
+        return {"value": value, "runs": count}
+
+    stddev = math.sqrt(m2 / (count - 1)) if count > 1 else 0.0
+    z_score = (value - mean) / stddev if stddev > 0 else 0.0
+    below = sum(c for k, c in sketch.items() if _bucket_order(k) < _bucket_order(key))
+
+    flag = None
+    if z_score >= ANOMALY_Z:
+        flag = "high"
+    elif z_score <= -ANOMALY_Z:
+        flag = "low"
+
+    return {
+        "value": value,
+        "runs": count,
+        "mean": mean,
+        "stddev": stddev,
+        "z_score": round(z_score, 2),
+        "percentile": round((below + same / 2) * 100 / count, 1),
+        "flag": flag,
+    }
+
+def _lock_stats(db: Session, user_id: int, tier: str, metrics) -> dict:
+    """없는 행은 만들고 (동시 첫 제출 대비 ON CONFLICT) 행 잠금을 잡은 뒤 반환"""
+    metrics = sorted(metrics)  # 잠금 순서 고정 (데드락 방지)
+    db.execute(
+        insert(UserTierStat)
+        .values([
+            {"owner_id": user_id, "tier": tier, "metric": m, "count": 0, "mean": 0.0, "m2": 0.0, "sketch": {}}
+            for m in metrics
+        ])
+        .on_conflict_do_nothing()
+    )
+    stats = (
+        db.query(UserTierStat)
+        .filter(
+            UserTierStat.owner_id == user_id,
+            UserTierStat.tier == tier,
+            UserTierStat.metric.in_(metrics)
+        )
+        .order_by(UserTierStat.metric)
+        .with_for_update()
+        .all()
+    )
+    return {s.metric: s for s in stats}
+
+def record_run(db: Session, report: BattleMain) -> dict:
+    """제출된 판을 누적 통계에 더하고, 더하기 전 기준의 비교 결과를 반환 (커밋은 호출한 쪽에서)"""
+    values = run_metric_values(report)
+    if not report.tier or not values:
+        return None
+
+    stats = _lock_stats(db, report.owner_id, report.tier, values)
+    comparison = {m: _compare(stats[m], v, included=False) for m, v in values.items()}
+    for metric, value in values.items():
+        _apply(stats[metric], value, 1)
+    return {"tier": report.tier, "metrics": comparison}
+
+def forget_run(db: Session, report: BattleMain):
+    """삭제/덮어쓰기 되는 판을 누적 통계에서 뺌 (커밋은 호출한 쪽에서)"""
+    values = run_metric_values(report)
+    if not report.tier or not values:
+        return
+
+    stats = _lock_stats(db, report.owner_id, report.tier, values)
+    for metric, value in values.items():
+        _apply(stats[metric], value, -1)
+
+def forget_runs(db: Session, user_id: int, rows):
+    """여러 판을 한꺼번에 뺌 (일괄 삭제의 RETURNING 결과). 티어마다 통계 행을 한 번만 잠금"""
+    by_tier = {}
+    for row in rows:
+        if row.tier:
+            by_tier.setdefault(row.tier, []).append(run_metric_values(row))
+
+    for tier in sorted(by_tier):
+        runs = [values for values in by_tier[tier] if values]
+        metrics = {m for values in runs for m in values}
+        if not metrics:
+            continue
+        stats = _lock_stats(db, user_id, tier, metrics)
+        for values in runs:
+            for metric, value in values.items():
+                _apply(stats[metric], value, -1)
+
+def forget_all_runs(db: Session, user_id: int):
+    db.query(UserTierStat).filter(UserTierStat.owner_id == user_id).delete(synchronize_session=False)
+
+def compare_runs(db: Session, user_id: int, reports) -> list:
+    """이미 저장된 판들을 (자기 자신을 뺀) 평소 기록과 비교 - 통계 조회는 한 번"""
+    tiers = {r.tier for r in reports if r.tier}
+    if not tiers:
+        return reports
+
+    stats = (
+        db.query(UserTierStat)
+        .filter(
+            UserTierStat.owner_id == user_id,
+            UserTierStat.tier.in_(tiers)
+        )
+        .all()
+    )
+    by_key = {(s.tier, s.metric): s for s in stats}
+
+    for report in reports:
+        metrics = {}
+        for metric, value in run_metric_values(report).items():
+            stat = by_key.get((report.tier, metric))
+            if stat and stat.count:
+                metrics[metric] = _compare(stat, value, included=True)
+        if metrics:
+            report.comparison = {"tier": report.tier, "metrics": metrics}
+    return reports
+
+def rebuild_run_stats(db: Session, user_id: int) -> int:
+    """기존 기록으로 누적 통계를 처음부터 다시 계산 (도입 시 백필 / 보정용)"""
+    forget_all_runs(db, user_id)
+
+    rows = (
+        db.query(
+            BattleMain.tier, BattleMain.wave, BattleMain.coin_earned,
+            BattleMain.cells_earned, BattleMain.real_time_seconds
+        )
+        .filter(BattleMain.owner_id == user_id, BattleMain.tier.isnot(None))
+        .order_by(BattleMain.battle_date)
+        .all()
+    )
+
+    stats = {}
+    for row in rows:
+        for metric, value in run_metric_values(row).items():
+            key = (row.tier, metric)
+            if key not in stats:
+                stats[key] = UserTierStat(owner_id=user_id, tier=row.tier, metric=metric, count=0, mean=0.0, m2=0.0, sketch={})
+            _apply(stats[key], value, 1)
+
+    db.add_all(stats.values())
+    db.commit()
+    return len(rows)
@@ -1,7 +1,6 @@
 # back/crud/stats.py
 from sqlalchemy.orm import Session
-from sqlalchemy import func, literal
-from models import BattleMain
+from sqlalchemy import text
 from datetime import datetime, timedelta, timezone
 
 # 헬퍼 함수 - 시간 계산 중복 제거
@@ -10,126 +9,154 @@ def get_yesterday():
     now_utc = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0).replace(tzinfo=None)
     return now_utc - timedelta(days=1)
 
-# 1. 일간 통계
+# 지표 이름 -> 집계식 (사용자 입력을 SQL에 직접 넣지 않기 위한 화이트리스트)
+STAT_METRICS = {
+    "coins": "sum(coin_earned)",
+    "cells": "sum(cells_earned)",
+    "shards": "sum(reroll_shards_earned)",
+    "runs": "count(*)",
+    "max_wave": "max(wave)",
+    # 판별 평균이 아니라 (총 코인 / 총 실제 플레이 시간)
+    "coins_per_hour": "sum(coin_earned) FILTER (WHERE real_time_seconds > 0) * 3600.0 / nullif(sum(real_time_seconds), 0)",
+}
+
+STAT_BUCKETS = {
+    "day": "1 day",
+    "week": "7 days",
+    "month": "1 month",
+}
+
+# 0. 범용 통계 엔진: 지표 x 구간(일/주/월) x 기간 x 티어
+def get_bucketed_stats(
+    db: Session,
+    user_id: int,
+    metrics: list,
+    bucket: str,
+    start_date: datetime,
+    end_date: datetime,
+    tier: str = None
+):
+    """
+    [start_date, end_date) 구간을 bucket 단위로 나눠 지표를 집계합니다.
+    빈 구간은 0으로 채우고, 직전 구간 대비 증감률(%)은 LAG 로 SQL 안에서 계산합니다.
+    일/주 구간은 start_date 기준으로 자르고, 월 구간은 달력 월(date_trunc) 기준입니다.
+    (월 구간은 start_date 가 월 중간이어도 그 달 1일로 맞춤 - 아니면 series 와 집계 구간이 어긋나 전부 0)
+    """
+    if bucket == "month":
+        range_start = "date_trunc('month', CAST(:start_date AS timestamp))"
+        bucket_expr = "date_trunc('month', battle_date)"
+    else:
+        range_start = "CAST(:start_date AS timestamp)"
+        bucket_expr = "p.series_start + CAST(floor(extract(epoch FROM battle_date - p.series_start) / extract(epoch FROM CAST(:step AS interval))) AS double precision) * CAST(:step AS interval)"
+
+    tier_filter = "AND tier = :tier" if tier else ""
+
+    agg_cols = ", ".join(f"{STAT_METRICS[m]} AS {m}" for m in metrics)
+    filled_cols = ", ".join(f"coalesce(a.{m}, 0) AS {m}" for m in metrics)
+    lag_cols = ", ".join(f"{m}, LAG({m}) OVER (ORDER BY bucket_start) AS {m}_prev" for m in metrics)
+    growth_cols = ", ".join(
+        f"{m}, CASE WHEN {m}_prev > 0 THEN round((({m} - {m}_prev) * 100.0 / {m}_prev)::numeric, 1) ELSE 0 END AS {m}_growth"
+        for m in metrics
+    )
+
+    # 첫 구간의 증감률 계산을 위해 한 구간 앞부터 집계
+    sql = f"""
+        WITH p AS (
+            SELECT {range_start} AS range_start,
+                   {range_start} - CAST(:step AS interval) AS series_start
+        ),
+        series AS (
+            SELECT generate_series(p.series_start, CAST(:end_date AS timestamp) - interval '1 microsecond', CAST(:step AS interval)) AS bucket_start
+            FROM p
+        ),
+        agg AS (
+            SELECT {bucket_expr} AS bucket_start, {agg_cols}
+            FROM battle_mains, p
+            WHERE owner_id = :user_id
+              AND battle_date >= p.series_start
+              AND battle_date < :end_date
+              {tier_filter}
+            GROUP BY 1
+        ),
+        filled AS (
+            SELECT s.bucket_start, {filled_cols}
+            FROM series s
+            LEFT JOIN agg a ON a.bucket_start = s.bucket_start
+        ),
+        lagged AS (
+            SELECT bucket_start, {lag_cols}
+            FROM filled
+        )
+        SELECT bucket_start, {growth_cols}
+        FROM lagged, p
+        WHERE bucket_start >= p.range_start
+        ORDER BY bucket_start
+    """
+
+    params = {
+        "user_id": user_id,
+        "start_date": start_date,
+        "end_date": end_date,
+        "step": STAT_BUCKETS[bucket],
+    }
+    if tier:
+        params["tier"] = tier
+
+    results = db.execute(text(sql), params).mappings().all()
+
+    buckets = []
+    for row in results:
+        values = {}
+        for m in metrics:
+            # coins 합계는 float 정밀도를 넘을 수 있어 정수로 유지
+            values[m] = float(row[m]) if m == "coins_per_hour" else int(row[m])
+        buckets.append({
+            "bucket_start": row["bucket_start"],
+            "values": values,
+            "growth": {m: float(row[f"{m}_growth"]) for m in metrics}
+        })
+    return buckets
+
+# 1. 일간 통계 (어제까지 최근 7일)
 def get_weekly_stats(db: Session, user_id: int):
     yesterday = get_yesterday()
-    fetch_start_date = yesterday - timedelta(days=7)
-    
-    # DB 레벨에서 날짜별 그룹화 및 합계 계산
-    results = db.query(
-        func.to_char(BattleMain.battle_date, 'YYYY-MM-DD').label('date_str'),
-        func.sum(BattleMain.coin_earned).label('total_coins'),
-        func.sum(BattleMain.cells_earned).label('total_cells')
-    ).filter(
-        BattleMain.owner_id == user_id,
-        BattleMain.battle_date >= fetch_start_date,
-        BattleMain.battle_date < (yesterday + timedelta(days=1))
-    ).group_by(
-        func.to_char(BattleMain.battle_date, 'YYYY-MM-DD')
-    ).all()
-
-    daily_map = {
-        r.date_str: {"coins": r.total_coins or 0, "cells": r.total_cells or 0}
-        for r in results
-    }
+
+    buckets = get_bucketed_stats(
+        db, user_id, ["coins", "cells"], "day",
+        start_date=yesterday - timedelta(days=6),
+        end_date=yesterday + timedelta(days=1)
+    )
 
     daily_stats = []
-    display_start_date = yesterday - timedelta(days=6)
-    
-    # 표시할 날짜 리스트 생성 (과거 -> 최신)
-    target_dates = []
-    for i in range(7):
-        d = display_start_date + timedelta(days=i)
-        target_dates.append(d.strftime("%Y-%m-%d"))
-
-    for date_str in target_dates:
-        curr_data = daily_map.get(date_str, {"coins": 0, "cells": 0})
-        
-        # 전일 데이터 조회 (성장률 계산용)
-        prev_date_obj = datetime.strptime(date_str, "%Y-%m-%d") - timedelta(days=1)
-        prev_date_str = prev_date_obj.strftime("%Y-%m-%d")
-        prev_data = daily_map.get(prev_date_str, {"coins": 0, "cells": 0})
-        
-        coin_growth = 0.0
-        if prev_data["coins"] > 0:
-            coin_growth = (curr_data["coins"] - prev_data["coins"]) / prev_data["coins"] * 100
-            
-        cell_growth = 0.0
-        if prev_data["cells"] > 0:
-            cell_growth = (curr_data["cells"] - prev_data["cells"]) / prev_data["cells"] * 100
-        
+    for b in buckets:
         daily_stats.append({
-            "date": date_str,
-            "total_coins": curr_data["coins"],
-            "total_cells": curr_data["cells"],
-            "coin_growth": round(coin_growth, 1),
-            "cell_growth": round(cell_growth, 1)
+            "date": b["bucket_start"].strftime("%Y-%m-%d"),
+            "total_coins": b["values"]["coins"],
+            "total_cells": b["values"]["cells"],
+            "coin_growth": b["growth"]["coins"],
+            "cell_growth": b["growth"]["cells"]
         })
 
     return {"daily_stats": daily_stats}
 
-# 2. 주간 트렌드
+# 2. 주간 트렌드 (어제로 끝나는 7일 단위 8주)
 def get_weekly_trends(db: Session, user_id: int):
     yesterday = get_yesterday()
-    fetch_start_date = yesterday - timedelta(days=63)
-    
-    # DB에서 주차 계산 및 그룹화
-    results = db.query(
-        func.floor(
-            func.extract('epoch', literal(yesterday) - BattleMain.battle_date) / (7 * 86400)
-        ).label('week_offset'),
-        func.sum(BattleMain.coin_earned).label('total_coins'),
-        func.sum(BattleMain.cells_earned).label('total_cells')
-    ).filter(
-        BattleMain.owner_id == user_id,
-        BattleMain.battle_date >= fetch_start_date,
-        BattleMain.battle_date < (yesterday + timedelta(days=1))
-    ).group_by('week_offset').all()
-
-    # 주차별 데이터 맵 생성
-    weekly_map = {}
-    for r in results:
-        week_idx = int(r.week_offset)
-        end_date = yesterday - timedelta(days=week_idx * 7)
-        start_date = end_date - timedelta(days=6)
-        key = start_date.strftime("%Y-%m-%d")
-        
-        weekly_map[key] = {
-            "coins": r.total_coins or 0,
-            "cells": r.total_cells or 0
-        }
+
+    buckets = get_bucketed_stats(
+        db, user_id, ["coins", "cells"], "week",
+        start_date=yesterday - timedelta(days=8 * 7 - 1),
+        end_date=yesterday + timedelta(days=1)
+    )
 
     trend_stats = []
-    target_weeks = []
-    
-    # 최근 8주 목록 생성
-    for i in range(8):
-        week_idx = 7 - i
-        end_date = yesterday - timedelta(days=week_idx * 7)
-        start_date = end_date - timedelta(days=6)
-        target_weeks.append(start_date.strftime("%Y-%m-%d"))
-
-    for week_str in target_weeks:
-        curr_data = weekly_map.get(week_str, {"coins": 0, "cells": 0})
-        
-        prev_date_obj = datetime.strptime(week_str, "%Y-%m-%d") - timedelta(days=7)
-        prev_week_str = prev_date_obj.strftime("%Y-%m-%d")
-        prev_data = weekly_map.get(prev_week_str, {"coins": 0, "cells": 0})
-        
-        coin_growth = 0.0
-        if prev_data["coins"] > 0:
-            coin_growth = (curr_data["coins"] - prev_data["coins"]) / prev_data["coins"] * 100
-            
-        cell_growth = 0.0
-        if prev_data["cells"] > 0:
-            cell_growth = (curr_data["cells"] - prev_data["cells"]) / prev_data["cells"] * 100
-            
+    for b in buckets:
         trend_stats.append({
-            "week_start_date": week_str,
-            "total_coins": curr_data["coins"],
-            "total_cells": curr_data["cells"],
-            "coin_growth": round(coin_growth, 1),
-            "cell_growth": round(cell_growth, 1)
+            "week_start_date": b["bucket_start"].strftime("%Y-%m-%d"),
+            "total_coins": b["values"]["coins"],
+            "total_cells": b["values"]["cells"],
+            "coin_growth": b["growth"]["coins"],
+            "cell_growth": b["growth"]["cells"]
         })
 
-    return {"weekly_stats": trend_stats}
\ No newline at end of file
+    return {"weekly_stats": trend_stats}
@@ -0,0 +1,97 @@
+# back/crud/sync.py
+# 델타 동기화: 클라이언트가 가진 버전(since) 이후의 추가/수정/삭제만 내려줌
+from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload
+from models import BattleMain, ReportChange
+from .report import LIGHT_DETAIL_COLUMNS
+from .archive import attach_archived_details
+
+def get_current_version(db: Session, user_id: int) -> int:
+    return (
+        db.query(func.max(ReportChange.id))
+        .filter(ReportChange.owner_id == user_id)
+        .scalar()
+    ) or 0
+
+def _load_reports(db: Session, user_id: int, battle_dates=None, before: datetime = None, limit: int = None):
+    query = (
+        db.query(BattleMain)
+        .options(
+            joinedload(BattleMain.detail).load_only(*LIGHT_DETAIL_COLUMNS)
+        )
+        .filter(BattleMain.owner_id == user_id)
+    )
+    if battle_dates is not None:
+        query = query.filter(BattleMain.battle_date.in_(battle_dates))
+    if before is not None:
+        query = query.filter(BattleMain.battle_date < before)
+
+    query = query.order_by(BattleMain.battle_date.desc())
+    if limit is not None:
+        query = query.limit(limit)
+    reports = query.all()
+    return attach_archived_details(db, user_id, reports)
+
+def _snapshot_page(db: Session, user_id: int, version: int, cursor: datetime, limit: int):
+    # 최신 기록부터 limit 개씩 (battle_date 커서). 마지막 페이지까지 같은 version 을 돌려줌
+    reports = _load_reports(db, user_id, before=cursor, limit=limit + 1)
+    has_more = len(reports) > limit
+    reports = reports[:limit]
+    return {
+        "version": version,
+        "reset": cursor is None,
+        "upserts": reports,
+        "deletes": [],
+        "has_more": has_more,
+        "cursor": reports[-1].battle_date if has_more else None
+    }
+
+def get_changes_since(db: Session, user_id: int, since: int, limit: int = 500, cursor: datetime = None):
+    # since=0: 로컬 캐시가 없는 클라이언트 -> 전체 스냅샷을 limit 단위 페이지로
+    # (변경 로그 도입 이전 기록은 로그에 없으므로 처음 한 번은 스냅샷이 필요)
+    if since <= 0:
+        # 버전을 먼저 읽어야 스냅샷 도중 생긴 변경을 다음 동기화에서 놓치지 않음
+        version = get_current_version(db, user_id)
+        return _snapshot_page(db, user_id, version, None, limit)
+    # 스냅샷 다음 페이지: since = 첫 페이지의 version, cursor = 이전 페이지의 cursor
+    # (페이지를 받는 동안 생긴 변경은 스냅샷이 끝난 뒤 since 부터 델타로 받음)
+    if cursor is not None:
+        return _snapshot_page(db, user_id, since, cursor, limit)
+
+    changes = (
+        db.query(ReportChange)
+        .filter(
+            ReportChange.owner_id == user_id,
+            ReportChange.id > since
+        )
+        .order_by(ReportChange.id)
+        .limit(limit + 1)
+        .all()
+    )
+
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    if not changes:
+        return {"version": since, "reset": False, "upserts": [], "deletes": [], "has_more": False, "cursor": None}
+
+    # 같은 기록이 여러 번 바뀌었으면 마지막 변경만 반영
+    last_op = {}
+    for change in changes:
+        last_op[change.battle_date] = change.op
+
+    upsert_dates = [d for d, op in last_op.items() if op == "upsert"]
+    upserts = _load_reports(db, user_id, upsert_dates) if upsert_dates else []
+
+    # upsert 이후 이미 지워진 기록은 삭제로 취급 (삭제 로그는 다음 페이지에서 다시 옴)
+    found = {r.battle_date for r in upserts}
+    deletes = [d for d, op in last_op.items() if op == "delete" or d not in found]
+
+    return {
+        "version": changes[-1].id,
+        "reset": False,
+        "upserts": upserts,
+        "deletes": sorted(deletes, reverse=True),
+        "has_more": has_more,
+        "cursor": None
+    }
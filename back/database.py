@@ -1,50 +1,233 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import DisconnectionError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 import os
+import threading
+import time
+from contextlib import contextmanager
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# [New] 커넥션 대기 허용 시간 (초). 이보다 오래 기다려야 하면 큐잉하지 않고 503
+DB_CHECKOUT_BUDGET = float(os.getenv("DB_CHECKOUT_BUDGET", 2))
+
+# [New] 커넥션 예산
+# 워커/리플리카 수와 상관없이 DB 서버 하나에 이 앱이 여는 커넥션 총량을 DB_MAX_CONNECTIONS 로 고정하고 워커 수로 나눔
+# (예전에는 워커마다 쓰기 10+20, 읽기 5+10 이라 워커 5개면 최대 225개)
+WEB_CONCURRENCY = max(int(os.getenv("WEB_CONCURRENCY", 1)), 1)  # gunicorn 워커 수 (gunicorn 도 같은 값을 읽음)
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", 60))    # 서버 하나당, 모든 워커 합계
+DB_RESERVED_CONNECTIONS = int(os.getenv("DB_RESERVED_CONNECTIONS", 2))  # 스케줄러 리더 락 + 마이그레이션/CLI 몫
+DB_READ_SHARE = float(os.getenv("DB_READ_SHARE", 0.3))  # 리플리카가 없을 때 읽기 풀이 가져가는 비율
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+# 체크아웃마다 핑(pool_pre_ping) 대신, 이 시간보다 오래 놀던 커넥션만 핑 (0 = 매번 핑)
+DB_PING_IDLE_SECONDS = float(os.getenv("DB_PING_IDLE_SECONDS", 30))
+
+# [New] 외부 트랜잭션 풀러 모드 (PgBouncer pool_mode=transaction 등)
+# 트랜잭션마다 서버 세션이 바뀌므로 세션 상태(prepared statement, 세션 advisory lock)를 쓰지 않음
+DB_POOLER = os.getenv("DB_POOLER", "") == "transaction"
+# 풀러 모드에서 프로세스 안 풀도 없앰 (요청마다 풀러에 새로 연결, 커넥션 수는 풀러가 제한)
+DB_NULLPOOL = DB_POOLER and os.getenv("DB_NULLPOOL", "0") == "1"
+
+# [New] 서버측 prepared statement (psycopg 3)
+# 같은 커넥션에서 같은 SQL 이 이 횟수만큼 실행되면 PREPARE 해두고 이후에는 파싱/플래닝 없이 실행
+# 0 = 첫 실행부터, off = 사용 안 함 (풀러 모드 기본값 - 프로토콜 수준 prepared statement 를 지원하는 풀러면 켜도 됨)
+# 비어 있으면(compose 에서 값 없이 넘긴 경우 포함) 모드 기본값: 풀러 모드 off, 아니면 1
+DB_PREPARE_THRESHOLD = os.getenv("DB_PREPARE_THRESHOLD", "").strip() or ("off" if DB_POOLER else "1")
+# 커넥션당 보관할 prepared statement 수 (넘치면 오래 안 쓴 것부터 DEALLOCATE)
+DB_PREPARED_MAX = int(os.getenv("DB_PREPARED_MAX", 200))
+# SQLAlchemy 컴파일 캐시 크기 (ORM 쿼리 -> SQL 문자열). 캐시에서 나온 같은 문자열이어야 위 PREPARE 가 재사용됨
+DB_QUERY_CACHE_SIZE = int(os.getenv("DB_QUERY_CACHE_SIZE", 1000))
+# [New] 여러 문장을 연달아 쓰는 쓰기 경로는 파이프라인으로 한 번에 전송 (결과를 기다리지 않음)
+DB_PIPELINE_WRITES = os.getenv("DB_PIPELINE_WRITES", "1") == "1"
+
+def _prepare_threshold():
+    if DB_PREPARE_THRESHOLD.lower() in ("off", "none"):
+        return None
+    return int(DB_PREPARE_THRESHOLD)
+
+ENGINE_OPTIONS = {
+    "connect_args": {"prepare_threshold": _prepare_threshold()},
+    "query_cache_size": DB_QUERY_CACHE_SIZE,
+}
+
+def _set_prepared_max(dbapi_conn, record):
+    dbapi_conn.prepared_max = DB_PREPARED_MAX
+
 POSTGRES_USER = os.getenv("POSTGRES_USER")
 POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
 POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
 POSTGRES_DB = os.getenv("POSTGRES_DB")
 
+def _url(server: str, port: str = POSTGRES_PORT) -> str:
+    return f"postgresql+psycopg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{server}:{port}/{POSTGRES_DB}"
+
+def pool_limits(budget: int) -> tuple:
+    """서버 하나의 커넥션 예산 -> 워커 하나의 (pool_size, max_overflow). 절반은 상시 유지, 나머지는 몰릴 때만 열었다 닫음"""
+    per_worker = max(budget // WEB_CONCURRENCY, 1)
+    pool_size = max(per_worker // 2, 1)
+    return pool_size, per_worker - pool_size
+
+def _create_engine(url: str, limits: tuple):
+    if DB_NULLPOOL:
+        new_engine = create_engine(url, poolclass=NullPool, **ENGINE_OPTIONS)
+    else:
+        pool_size, max_overflow = limits
+        new_engine = create_engine(
+            url,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_timeout=DB_CHECKOUT_BUDGET,
+            **ENGINE_OPTIONS
+        )
+        _listen_liveness(new_engine)
+    event.listen(new_engine, "connect", _set_prepared_max)
+    return new_engine
+
+def _listen_liveness(target):
+    """
+    pool_pre_ping 대체: 이미 끊긴 것이 보이는 커넥션(closed/broken)은 핑 없이 버리고,
+    DB_PING_IDLE_SECONDS 넘게 놀던 커넥션만 체크아웃 때 핑. 방금 반납된 커넥션은 왕복 없이 바로 사용.
+    DisconnectionError 를 던지면 풀이 그 커넥션을 버리고 새로 연결해서 다시 체크아웃함.
+    """
+    def on_checkin(dbapi_conn, record):
+        record.info["idle_since"] = time.monotonic()
+
+    def on_checkout(dbapi_conn, record, proxy):
+        if dbapi_conn.closed or dbapi_conn.broken:
+            raise DisconnectionError()
+        idle_since = record.info.pop("idle_since", None)
+        if idle_since is not None and time.monotonic() - idle_since > DB_PING_IDLE_SECONDS:
+            try:
+                target.dialect.do_ping(dbapi_conn)
+            except Exception:
+                raise DisconnectionError()
+
+    event.listen(target, "checkin", on_checkin)
+    event.listen(target, "checkout", on_checkout)
+
 # 1. 메인 서버 (쓰기용)
 POSTGRES_SERVER = os.getenv("POSTGRES_SERVER")
-DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/{POSTGRES_DB}"
-
-engine = create_engine(
-    DATABASE_URL,
-    pool_size=10,        # [수정] 20 -> 10
-    max_overflow=20,     # [수정] 40 -> 20
-    pool_recycle=3600,   # 1시간마다 물갈이
-    pool_pre_ping=True   # [필수] 연결 끊김 방지
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+DATABASE_URL = _url(POSTGRES_SERVER)
+
+# 세션 상태가 필요한 커넥션(스케줄러 리더 락)용 - 풀러 모드에서는 풀러를 거치지 않고 Postgres 에 직접 연결
+POSTGRES_SERVER_DIRECT = os.getenv("POSTGRES_SERVER_DIRECT") or POSTGRES_SERVER
+DATABASE_URL_DIRECT = _url(POSTGRES_SERVER_DIRECT, os.getenv("POSTGRES_PORT_DIRECT", POSTGRES_PORT))
 
 # 2. 리플리카 서버 (읽기용)
 POSTGRES_SERVER_READ = os.getenv("POSTGRES_SERVER_READ")
 if not POSTGRES_SERVER_READ:
     POSTGRES_SERVER_READ = POSTGRES_SERVER
 
-DATABASE_URL_READ = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER_READ}:{POSTGRES_PORT}/{POSTGRES_DB}"
+DATABASE_URL_READ = _url(POSTGRES_SERVER_READ)
+
+# 3. 예산 배분 - 리플리카가 없으면 읽기 풀도 메인 서버 예산을 나눠 씀
+_primary_budget = max(DB_MAX_CONNECTIONS - DB_RESERVED_CONNECTIONS, 2)
+if POSTGRES_SERVER_READ == POSTGRES_SERVER:
+    _read_budget = max(int(_primary_budget * DB_READ_SHARE), 1)
+    _write_budget = _primary_budget - _read_budget
+else:
+    _read_budget = DB_MAX_CONNECTIONS
+    _write_budget = _primary_budget
 
-engine_read = create_engine(
-    DATABASE_URL_READ,
-    pool_size=5,         # [수정] 20 -> 5 (기본값과 동일)
-    max_overflow=10,     # [수정] 40 -> 10 (기본값과 동일)
-    pool_recycle=3600,
-    pool_pre_ping=True   # 숫자는 작아도 이 기능 때문에 설정 필수!
-)
+WRITE_POOL = pool_limits(_write_budget)
+READ_POOL = pool_limits(_read_budget)
+if WEB_CONCURRENCY > min(_write_budget, _read_budget):
+    # 워커마다 최소 1개는 필요해서 예산을 넘음 -> DB_MAX_CONNECTIONS 를 늘리거나 워커를 줄이거나 DB_POOLER 사용
+    print(f"[DB] Warning: {WEB_CONCURRENCY} workers exceed the connection budget ({DB_MAX_CONNECTIONS}), using 1 connection per worker")
+
+engine = _create_engine(DATABASE_URL, WRITE_POOL)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+engine_read = _create_engine(DATABASE_URL_READ, READ_POOL)
 SessionLocalRead = sessionmaker(autocommit=False, autoflush=False, bind=engine_read)
 
 Base = declarative_base()
 
+# 4. 풀 어드미션 컨트롤
+class PoolBusyError(Exception):
+    """풀이 가득 차서 예산 안에 커넥션을 받을 수 없을 때 (main.py 에서 503 으로 변환)"""
+
+class PoolAdmission:
+    """
+    실제 풀 상태로 어드미션 컨트롤: 풀의 커넥션이 모두 체크아웃된 상태에서
+    예상 대기 시간(앞에서 기다리는 요청 수 x 평균 점유 시간 / 커넥션 수)이나 최근 실제 체크아웃 대기 시간(EWMA)이
+    예산을 넘으면 pool_timeout 까지 기다리지 않고 즉시 거절합니다.
+    """
+    def __init__(self, engine, budget: float, capacity: int):
+        self.engine = engine
+        self.budget = budget
+        self.capacity = capacity  # 워커 하나의 pool_size + max_overflow
+        self.avg_hold = 0.05
+        self.avg_wait = 0.0
+        self.waiting = 0  # 체크아웃을 기다리는 요청 수
+        self._lock = threading.Lock()
+
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+
+    def _on_checkout(self, dbapi_conn, record, proxy):
+        record.info["checked_out_at"] = time.monotonic()
+
+    def _on_checkin(self, dbapi_conn, record):
+        started = record.info.pop("checked_out_at", None)
+        if started is not None:
+            held = time.monotonic() - started
+            self.avg_hold = self.avg_hold * 0.9 + held * 0.1
+
+    def saturated(self) -> bool:
+        # NullPool 에는 풀 상태가 없음 (대기열은 풀러 쪽) -> 여기서는 거절하지 않음
+        checkedout = getattr(self.engine.pool, "checkedout", None)
+        return checkedout is not None and checkedout() >= self.capacity
+
+    def expected_wait(self) -> float:
+        if not self.saturated():
+            return 0.0
+        queued = (self.waiting + 1) / self.capacity * self.avg_hold
+        return max(queued, self.avg_wait)
+
+    def checkout(self, db):
+        """
+        세션의 커넥션을 바로 받아둠. 풀이 가득 차 예산 안에 못 받을 것 같으면 PoolBusyError
+        (기다렸는데 pool_timeout 이 지나면 sqlalchemy TimeoutError - 둘 다 main.py 에서 503)
+        """
+        with self._lock:
+            if self.expected_wait() > self.budget:
+                raise PoolBusyError()
+            self.waiting += 1
+
+        started = time.monotonic()
+        try:
+            db.connection()
+        finally:
+            waited = time.monotonic() - started
+            with self._lock:
+                self.waiting -= 1
+                self.avg_wait = self.avg_wait * 0.8 + waited * 0.2
+
+admission = PoolAdmission(engine, DB_CHECKOUT_BUDGET, sum(WRITE_POOL))
+admission_read = PoolAdmission(engine_read, DB_CHECKOUT_BUDGET, sum(READ_POOL))
+
+# 5. 쓰기 파이프라인
+@contextmanager
+def write_pipeline(db):
+    """
+    블록 안에서 실행한 문장들을 psycopg 파이프라인으로 묶어 보내고, 블록을 빠져나갈 때 한 번만 결과를 기다립니다.
+    결과(행/rowcount)를 읽지 않는 Core INSERT/UPDATE/DELETE 만 넣어야 합니다 (ORM flush 는 블록 밖에서).
+    """
+    if not DB_PIPELINE_WRITES:
+        yield
+        return
+    with db.connection().connection.driver_connection.pipeline():
+        yield
+
 def get_db():
     db = SessionLocal()
     try:
+        admission.checkout(db)
         yield db
     finally:
         db.close()
@@ -52,6 +235,7 @@ def get_db():
 def get_db_read():
     db = SessionLocalRead()
     try:
+        admission_read.checkout(db)
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
@@ -0,0 +1,132 @@
+# back/detail_codec.py
+# BattleDetail 압축 인코딩
+# 4개의 JSONB 컬럼에 매번 반복 저장되던 한글 키 문자열을 metric_keys 사전의 정수 id로 바꾸고,
+# 값은 배열 3개 (id / 숫자값 / 원본 표기)로 저장합니다.
+#   metric_ids    int[]     -> metric_keys.id (섹션 + 이름)
+#   metric_values float8[]  -> 숫자로 해석한 값 (해석 불가면 NULL)
+#   metric_texts  text[]    -> 게임 원본 표기. 숫자값으로 똑같이 다시 만들 수 있는 표기("1.23B", "321")는 NULL 로 두고
+#                              만들 수 없는 것("$1.23M", "123,456", "12%", 숫자가 아닌 값)만 저장 (모두 NULL 이면 컬럼도 NULL)
+import re
+from functools import lru_cache
+from sqlalchemy import text
+from crud.utils import parse_game_number_safe
+
+# 섹션 이름 -> BattleDetailResponse 필드
+SECTION_COLUMNS = {
+    "combat": "combat_json",
+    "utility": "utility_json",
+    "enemy": "enemy_json",
+    "bot": "bot_json",
+}
+
+_NUMERIC_RE = re.compile(r'^[\$xX]?-?[\d,]*\.?\d+[a-zA-Z]?%?$')
+
+# 사전 캐시 (추가만 되고 바뀌지 않으므로 워커별로 들고 있어도 안전)
+_keys_by_id = {}
+_ids_by_key = {}
+
+def _load_dictionary(conn):
+    if conn is None:
+        # 세션에서 분리된 객체 (object_session() 이 None) -> 엔진에서 직접 읽음
+        from database import engine
+        with engine.connect() as own_conn:
+            return _load_dictionary(own_conn)
+    rows = conn.execute(text("SELECT id, section, name FROM metric_keys")).all()
+    for row in rows:
+        _keys_by_id[row.id] = (row.section, row.name)
+        _ids_by_key[(row.section, row.name)] = row.id
+
+def _intern_keys(pairs):
+    """처음 보는 (섹션, 키)를 사전에 등록. 인제스트 트랜잭션과 분리해서 바로 커밋합니다."""
+    missing = [p for p in pairs if p not in _ids_by_key]
+    if not missing:
+        return
+
+    from database import engine
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO metric_keys (section, name) VALUES (:section, :name) "
+                 "ON CONFLICT (section, name) DO NOTHING"),
+            [{"section": s, "name": n} for s, n in missing]
+        )
+        _load_dictionary(conn)
+
+def lookup_metric_id(db, section: str, name: str):
+    """(섹션, 이름) -> metric_keys.id. 다른 워커가 등록한 키일 수 있으므로 캐시에 없으면 사전을 다시 읽음"""
+    if (section, name) not in _ids_by_key:
+        _load_dictionary(db)
+    return _ids_by_key.get((section, name))
+
+def metric_key(db, metric_id: int):
+    """metric_keys.id -> (섹션, 이름)"""
+    if metric_id not in _keys_by_id:
+        _load_dictionary(db)
+    return _keys_by_id.get(metric_id, (None, None))
+
+def typed_value(raw: str):
+    """'1.23B', '$5.2M', 'x1.5', '12%' -> float / 숫자가 아니면 None"""
+    clean = str(raw).strip()
+    if not _NUMERIC_RE.match(clean):
+        return None
+    clean = clean.lstrip('$xX').rstrip('%')
+    return parse_game_number_safe(clean)
+
+# 게임 표기 접미사 (1000 배씩)
+_SUFFIXES = ("K", "M", "B", "T", "q", "Q", "s", "S", "O", "N", "D", "U")
+
+# 게임 표기는 유효숫자 3~4자리 x 접미사라 서로 다른 값이 많지 않음 -> 캐시 (목록 조회마다 수만 번 호출)
+@lru_cache(maxsize=65536)
+def display_text(value: float) -> str:
+    """숫자값 -> 게임 표기 ('1.23B', '321'). metric_texts 가 NULL 인 항목의 화면 표시용"""
+    if abs(value) < 1000:
+        return str(int(value)) if value == int(value) else f"{value:.2f}".rstrip("0").rstrip(".")
+    exponent = 0
+    while abs(value) >= 1000 and exponent < len(_SUFFIXES):
+        value /= 1000
+        exponent += 1
+    return f"{value:.2f}".rstrip("0").rstrip(".") + _SUFFIXES[exponent - 1]
+
+def _stored_text(raw: str, value):
+    return None if value is not None and display_text(value) == raw else raw
+
+def encode_detail(detail_data: dict) -> dict:
+    """parse_battle_report()의 detail dict -> BattleDetail 배열 컬럼"""
+    entries = []
+    for section, column in SECTION_COLUMNS.items():
+        for name, raw in (detail_data.get(column) or {}).items():
+            entries.append((section, name, str(raw)))
+
+    _intern_keys([(s, n) for s, n, _ in entries])
+
+    values = [typed_value(raw) for _, _, raw in entries]
+    texts = [_stored_text(raw, value) for (_, _, raw), value in zip(entries, values)]
+    return {
+        "metric_ids": [_ids_by_key[(s, n)] for s, n, _ in entries],
+        "metric_values": values,
+        "metric_texts": texts if any(t is not None for t in texts) else None,
+    }
+
+def decode_detail(db, detail, sections=None) -> dict:
+    """BattleDetail -> BattleDetailResponse 모양의 dict. 아직 변환 안 된 JSONB 행도 처리합니다."""
+    wanted = sections or list(SECTION_COLUMNS.values())
+    result = {column: {} for column in wanted}
+    if detail is None:
+        return result
+
+    if detail.metric_ids is None:
+        for column in wanted:
+            result[column] = getattr(detail, column) or {}
+        return result
+
+    if any(i not in _keys_by_id for i in detail.metric_ids):
+        _load_dictionary(db)
+
+    count = len(detail.metric_ids)
+    values = detail.metric_values or [None] * count
+    texts = detail.metric_texts or [None] * count
+    for metric_id, value, raw in zip(detail.metric_ids, values, texts):
+        section, name = _keys_by_id.get(metric_id, (None, None))
+        column = SECTION_COLUMNS.get(section)
+        if column in result:
+            result[column][name] = raw if raw is not None else display_text(value)
+    return result
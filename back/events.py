@@ -0,0 +1,119 @@
+# back/events.py
+# 유저별 실시간 이벤트 허브 (SSE 스트림으로 전달)
+# - REDIS_URL 이 있으면 Redis pub/sub 으로 모든 gunicorn 워커에 팬아웃
+# - 없으면 같은 프로세스 안에서만 전달 (단일 워커/개발용)
+import asyncio
+import json
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from dotenv import load_dotenv
+
+import crud
+
+load_dotenv()
+
+REDIS_URL = os.getenv("REDIS_URL")
+QUEUE_SIZE = 100  # 느린 클라이언트 때문에 메모리가 무한히 늘지 않도록
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+class InProcessBroker:
+    def __init__(self):
+        self._subscribers = {}  # user_id -> {(loop, queue), ...}
+        self._lock = threading.Lock()
+
+    def _dispatch(self, user_id: int, event: dict):
+        with self._lock:
+            targets = list(self._subscribers.get(user_id, ()))
+        for loop, queue in targets:
+            loop.call_soon_threadsafe(self._offer, queue, event)
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, event: dict):
+        if not queue.full():
+            queue.put_nowait(event)
+
+    def publish(self, user_id: int, event: dict):
+        """동기 코드(스레드풀)에서도 호출 가능"""
+        self._dispatch(user_id, event)
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int):
+        entry = (asyncio.get_running_loop(), asyncio.Queue(maxsize=QUEUE_SIZE))
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(entry)
+        try:
+            yield entry[1]
+        finally:
+            with self._lock:
+                subs = self._subscribers.get(user_id)
+                if subs:
+                    subs.discard(entry)
+                    if not subs:
+                        del self._subscribers[user_id]
+
+class RedisBroker(InProcessBroker):
+    CHANNEL_PREFIX = "events:"
+
+    def __init__(self, url: str):
+        super().__init__()
+        self._client = redis.Redis.from_url(url)
+        self._listener = None
+
+    def publish(self, user_id: int, event: dict):
+        # 다른 워커뿐 아니라 자기 자신도 리스너를 통해 받음
+        self._client.publish(f"{self.CHANNEL_PREFIX}{user_id}", json.dumps(event, default=str))
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(f"{self.CHANNEL_PREFIX}*")
+                for message in pubsub.listen():
+                    channel = message["channel"].decode()
+                    user_id = int(channel[len(self.CHANNEL_PREFIX):])
+                    self._dispatch(user_id, json.loads(message["data"]))
+            except Exception as e:
+                print(f"[Events] Redis listener error: {e}")
+                time.sleep(1)
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int):
+        if self._listener is None:
+            self._listener = threading.Thread(target=self._listen, daemon=True)
+            self._listener.start()
+        async with super().subscribe(user_id) as queue:
+            yield queue
+
+hub = RedisBroker(REDIS_URL) if (REDIS_URL and redis) else InProcessBroker()
+
+def publish(user_id: int, event_type: str, data: dict):
+    try:
+        hub.publish(user_id, {"type": event_type, "data": data})
+    except Exception as e:
+        print(f"[Events] Publish Error: {e}")
+
+def notify_reports_changed(db, user_id: int, event_type: str, battle_date):
+    """기록 추가/삭제 커밋 후 호출: 해당 이벤트 + 그날의 최신 집계(stats_changed)를 전송"""
+    publish(user_id, event_type, {"battle_date": battle_date.isoformat()})
+
+    try:
+        day = battle_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        buckets = crud.get_bucketed_stats(
+            db, user_id, ["coins", "cells", "shards", "runs"], "day",
+            start_date=day, end_date=day + timedelta(days=1)
+        )
+        if buckets:
+            publish(user_id, "stats_changed", {
+                "date": day.strftime("%Y-%m-%d"),
+                "values": buckets[0]["values"],
+                "version": crud.get_current_version(db, user_id)
+            })
+    except Exception as e:
+        print(f"[Events] Rollup Error: {e}")
@@ -0,0 +1,68 @@
+# back/jobs.py
+# 요청 경로 밖에서 도는 유지보수 작업 (scheduler.py 가 주기 실행, 수동 실행: python jobs.py <job>)
+import sys
+from datetime import datetime, timedelta, timezone
+from database import SessionLocal
+from scheduler import Job
+import crud
+from models import ReportChange
+
+def archive_details():
+    """오래된 상세 데이터를 콜드 티어로 이동 (DETAIL_ARCHIVE_AFTER_DAYS 이전)"""
+    db = SessionLocal()
+    try:
+        total = 0
+        while True:
+            moved = crud.archive_old_details(db)
+            if not moved:
+                break
+            total += moved
+            print(f"[Jobs] archived {total} details")
+        return total
+    finally:
+        db.close()
+
+def refresh_leaderboard():
+    """티어 리더보드/백분위 뷰 갱신"""
+    db = SessionLocal()
+    try:
+        return crud.refresh_tier_aggregates(db)
+    finally:
+        db.close()
+
+def reconcile_run_stats(active_within_days: int = 2):
+    """최근 기록이 바뀐 유저의 누적 통계를 기록에서 다시 계산 (증분 갱신 오차/누락 보정)"""
+    since = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=active_within_days)
+    db = SessionLocal()
+    try:
+        user_ids = [
+            user_id for (user_id,) in
+            db.query(ReportChange.owner_id)
+            .filter(ReportChange.changed_at >= since)
+            .distinct()
+            .all()
+        ]
+        for user_id in user_ids:
+            crud.rebuild_run_stats(db, user_id)
+        return len(user_ids)
+    finally:
+        db.close()
+
+JOBS = {
+    "archive-details": archive_details,
+    "refresh-leaderboard": refresh_leaderboard,
+    "reconcile-run-stats": reconcile_run_stats,
+}
+
+# 스케줄러에 등록되는 주기 작업 (초 단위: 주기, 타임아웃, 지터)
+SCHEDULED_JOBS = [
+    Job("refresh-leaderboard", refresh_leaderboard, interval=10 * 60, timeout=5 * 60, jitter=60),
+    Job("archive-details", archive_details, interval=6 * 3600, timeout=30 * 60, jitter=10 * 60),
+    Job("reconcile-run-stats", reconcile_run_stats, interval=24 * 3600, timeout=30 * 60, jitter=30 * 60),
+]
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] not in JOBS:
+        print(f"usage: python jobs.py [{'|'.join(JOBS)}]")
+        sys.exit(1)
+    print(JOBS[sys.argv[1]]())
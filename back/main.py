@@ -1,10 +1,28 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from database import engine, Base
-from routers import reports, auth, progress, modules
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from database import engine, Base, PoolBusyError
+from routers import reports, auth, progress, modules, leaderboard, events, profiles, catalog
+from profiling import ProfilingMiddleware
+from migrations import run_migrations
+from scheduler import Scheduler, SCHEDULER_ENABLED
+from jobs import SCHEDULED_JOBS
 Base.metadata.create_all(bind=engine)
+run_migrations()
 
-app = FastAPI(title="The Tower Battle Reports API")
+# [New] 유지보수 스케줄러 - 모든 워커에서 시작하지만 advisory lock 을 잡은 워커 하나만 작업 실행
+scheduler = Scheduler(SCHEDULED_JOBS)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if SCHEDULER_ENABLED:
+        scheduler.start()
+    yield
+    scheduler.stop()
+
+app = FastAPI(title="The Tower Battle Reports API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,10 +38,26 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# [New] opt-in 샘플링 프로파일러 (PROFILE_SAMPLE_RATE / 관리자 서명 X-Profile 헤더)
+app.add_middleware(ProfilingMiddleware)
+# [New] DB 풀 포화 시 큐잉 대신 즉시 503 (클라이언트는 Retry-After 후 재시도)
+@app.exception_handler(PoolBusyError)
+@app.exception_handler(PoolTimeoutError)
+async def pool_busy_handler(request: Request, exc: Exception):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "서버가 혼잡합니다. 잠시 후 다시 시도해주세요."},
+        headers={"Retry-After": "1"},
+    )
+
 app.include_router(auth.router)
 app.include_router(reports.router)
 app.include_router(progress.router)
 app.include_router(modules.router)
+app.include_router(leaderboard.router)
+app.include_router(events.router)
+app.include_router(profiles.router)
+app.include_router(catalog.router)
 
 @app.get("/")
 def root():
@@ -0,0 +1,385 @@
+# back/migrations.py
+# create_all()이 처리하지 못하는 스키마 (머티리얼라이즈드 뷰, 특수 인덱스, 컬럼 추가 등)
+# 모든 구문은 IF NOT EXISTS 형태로 작성해서 여러 번 실행해도 안전해야 합니다.
+import json
+import sys
+import time
+from sqlalchemy import text
+from database import engine, SessionLocal
+
+# 워커 5개가 동시에 부팅해도 DDL이 한 번에 하나씩만 돌도록 잠금
+MIGRATION_LOCK_KEY = 7402001
+
+# 티어별 백분위 컷 (0%, 1%, ..., 100%)
+PERCENTILE_POINTS = [i / 100 for i in range(101)]
+_PERCENTILE_ARRAY = "ARRAY[" + ",".join(f"{p:.2f}" for p in PERCENTILE_POINTS) + "]::float8[]"
+
+STATEMENTS = [
+    # 1. 티어별 유저 최고 기록 (리더보드)
+    """
+    CREATE MATERIALIZED VIEW IF NOT EXISTS tier_user_bests AS
+    SELECT m.tier,
+           m.owner_id,
+           u.username,
+           max(m.wave) AS best_wave,
+           max(m.coins_per_hour) AS best_coins_per_hour,
+           count(*) AS runs
+    FROM battle_mains m
+    JOIN users u ON u.id = m.owner_id
+    WHERE m.tier IS NOT NULL
+    GROUP BY m.tier, m.owner_id, u.username
+    """,
+    # REFRESH ... CONCURRENTLY 에는 유니크 인덱스가 필수
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_tier_user_bests ON tier_user_bests (tier, owner_id)",
+    "CREATE INDEX IF NOT EXISTS idx_tier_user_bests_wave ON tier_user_bests (tier, best_wave DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_tier_user_bests_cph ON tier_user_bests (tier, best_coins_per_hour DESC)",
+
+    # 2. 티어별 백분위 컷 (전체 판 기준) - 백분위 조회는 tier 한 줄만 읽으면 끝
+    f"""
+    CREATE MATERIALIZED VIEW IF NOT EXISTS tier_percentiles AS
+    SELECT tier,
+           count(*) AS runs,
+           percentile_cont({_PERCENTILE_ARRAY}) WITHIN GROUP (ORDER BY wave) AS wave_cuts,
+           percentile_cont({_PERCENTILE_ARRAY}) WITHIN GROUP (ORDER BY coins_per_hour) AS cph_cuts
+    FROM battle_mains
+    WHERE tier IS NOT NULL
+    GROUP BY tier
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_tier_percentiles ON tier_percentiles (tier)",
+
+    # 3. 상세 데이터 압축 인코딩 (detail_codec.py)
+    "ALTER TABLE battle_details ADD COLUMN IF NOT EXISTS metric_ids integer[]",
+    "ALTER TABLE battle_details ADD COLUMN IF NOT EXISTS metric_values double precision[]",
+    "ALTER TABLE battle_details ADD COLUMN IF NOT EXISTS metric_texts text[]",
+
+    # 4. 정렬/필터용 숫자 컬럼 + 조회 API(/api/reports/query)용 복합 인덱스
+    "ALTER TABLE battle_mains ADD COLUMN IF NOT EXISTS game_time_seconds integer",
+    "ALTER TABLE battle_mains ADD COLUMN IF NOT EXISTS real_time_seconds integer",
+    "ALTER TABLE battle_mains ADD COLUMN IF NOT EXISTS damage_dealt_value double precision",
+    "ALTER TABLE battle_mains ADD COLUMN IF NOT EXISTS damage_taken_value double precision",
+    "CREATE INDEX IF NOT EXISTS idx_owner_tier_wave ON battle_mains (owner_id, tier, wave)",
+    "CREATE INDEX IF NOT EXISTS idx_owner_killer_date ON battle_mains (owner_id, killer, battle_date)",
+    # 정렬 인덱스: 값이 있는 행만 담는 부분 인덱스 (query_reports 가 정렬 컬럼 IS NOT NULL 로 거름)
+    # desc 는 거꾸로, asc 는 앞으로 읽어서 정렬 없이 LIMIT 에서 멈춤. 쓰기가 잦은 테이블이라 API 정렬 키 4개만
+    "DROP INDEX IF EXISTS ix_battle_mains_battle_date",  # 기본 키 인덱스와 중복
+    "DROP INDEX IF EXISTS idx_owner_cph",
+    "DROP INDEX IF EXISTS idx_owner_real_time",
+    "DROP INDEX IF EXISTS idx_owner_damage_dealt",
+    *(
+        f"DROP INDEX IF EXISTS idx_owner_{column}_sort"
+        for column in (
+            "wave", "coins_per_hour", "coin_earned", "cells_earned",
+            "game_time_seconds", "real_time_seconds", "damage_dealt_value", "damage_taken_value",
+        )
+    ),
+    *(
+        f"CREATE INDEX IF NOT EXISTS idx_owner_{column}_nn ON battle_mains (owner_id, {column}, battle_date) WHERE {column} IS NOT NULL"
+        for column in ("wave", "coins_per_hour", "real_time_seconds", "damage_dealt_value")
+    ),
+
+    # 5. 메모/처치자 부분 검색 - owner_id(btree_gin) + 트라이그램을 한 GIN 인덱스로
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE EXTENSION IF NOT EXISTS btree_gin",
+    "CREATE INDEX IF NOT EXISTS idx_owner_notes_trgm ON battle_mains USING gin (owner_id, notes gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_owner_killer_trgm ON battle_mains USING gin (owner_id, killer gin_trgm_ops)",
+
+    # 6. 중복 제출 차단 (유저별 원문 해시)
+    "ALTER TABLE battle_mains ADD COLUMN IF NOT EXISTS content_hash varchar(64)",
+    # 유저별 해시는 하나만 (동시에 들어온 같은 원문은 두 번째가 IntegrityError -> 기존 기록 반환)
+    # 유니크 인덱스를 만들기 전에 이미 겹친 해시는 가장 오래된 기록만 남기고 비움
+    # (인덱스가 아직 없을 때 한 번만 - 이후 부팅에서는 카탈로그 조회 한 번으로 끝)
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_indexes WHERE indexname = 'uq_owner_content_hash') THEN
+            UPDATE battle_mains m SET content_hash = NULL
+            WHERE content_hash IS NOT NULL AND EXISTS (
+                SELECT 1 FROM battle_mains o
+                WHERE o.owner_id = m.owner_id AND o.content_hash = m.content_hash AND o.battle_date < m.battle_date
+            );
+        END IF;
+    END
+    $$
+    """,
+    "DROP INDEX IF EXISTS idx_owner_content_hash",
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_owner_content_hash ON battle_mains (owner_id, content_hash) WHERE content_hash IS NOT NULL",
+]
+
+def run_migrations(bind=engine):
+    with bind.begin() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        for stmt in STATEMENTS:
+            conn.execute(text(stmt))
+
+# --- 데이터 변환 (수동 실행: python migrations.py <command>) ---
+
+def pack_legacy_details(batch_size: int = 500) -> int:
+    """JSONB 4개 컬럼으로 저장된 기존 행을 압축 인코딩으로 변환"""
+    import detail_codec
+    from models import BattleDetail
+
+    total = 0
+    db = SessionLocal()
+    try:
+        while True:
+            rows = (
+                db.query(BattleDetail)
+                .filter(BattleDetail.metric_ids.is_(None))
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                break
+
+            for row in rows:
+                packed = detail_codec.encode_detail({
+                    "combat_json": row.combat_json,
+                    "utility_json": row.utility_json,
+                    "enemy_json": row.enemy_json,
+                    "bot_json": row.bot_json,
+                })
+                row.metric_ids = packed["metric_ids"]
+                row.metric_values = packed["metric_values"]
+                row.metric_texts = packed["metric_texts"]
+                row.combat_json = None
+                row.utility_json = None
+                row.enemy_json = None
+                row.bot_json = None
+
+            db.commit()
+            total += len(rows)
+            print(f"[Migration] packed {total} details")
+    finally:
+        db.close()
+    return total
+
+def compact_metric_texts(batch_size: int = 1000) -> int:
+    """압축 인코딩 행의 metric_texts 에서 숫자값으로 다시 만들 수 있는 표기를 NULL 로 (detail_codec.display_text)"""
+    import detail_codec
+    from models import BattleDetail
+
+    total = 0
+    last_date = None
+    db = SessionLocal()
+    try:
+        while True:
+            query = db.query(BattleDetail).filter(BattleDetail.metric_texts.isnot(None))
+            if last_date is not None:
+                query = query.filter(BattleDetail.battle_date > last_date)
+            rows = query.order_by(BattleDetail.battle_date).limit(batch_size).all()
+            if not rows:
+                break
+
+            for row in rows:
+                texts = [
+                    raw if raw is None else detail_codec._stored_text(raw, value)
+                    for raw, value in zip(row.metric_texts, row.metric_values or [None] * len(row.metric_texts))
+                ]
+                row.metric_texts = texts if any(t is not None for t in texts) else None
+
+            db.commit()
+            last_date = rows[-1].battle_date
+            total += len(rows)
+            print(f"[Migration] compacted texts of {total} details")
+    finally:
+        db.close()
+    return total
+
+def backfill_numeric_columns(batch_size: int = 1000) -> int:
+    """game_time / real_time / damage 문자열 -> 숫자 컬럼 채우기"""
+    from models import BattleMain
+    from parser import parse_duration
+    from crud.utils import parse_game_number_safe
+
+    total = 0
+    db = SessionLocal()
+    try:
+        while True:
+            rows = (
+                db.query(BattleMain)
+                .filter(BattleMain.damage_dealt_value.is_(None))
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                break
+
+            for row in rows:
+                row.game_time_seconds = parse_duration(row.game_time)
+                row.real_time_seconds = parse_duration(row.real_time)
+                row.damage_dealt_value = parse_game_number_safe(row.damage_dealt)
+                row.damage_taken_value = parse_game_number_safe(row.damage_taken)
+
+            db.commit()
+            total += len(rows)
+            print(f"[Migration] backfilled {total} reports")
+    finally:
+        db.close()
+    return total
+
+def backfill_run_stats() -> int:
+    """유저/티어별 누적 통계(user_tier_stats)를 기존 기록으로 다시 계산"""
+    from models import User
+    from crud.run_stats import rebuild_run_stats
+
+    total = 0
+    db = SessionLocal()
+    try:
+        for (user_id,) in db.query(User.id).order_by(User.id).all():
+            total += rebuild_run_stats(db, user_id)
+        print(f"[Migration] rebuilt run stats from {total} reports")
+    finally:
+        db.close()
+    return total
+
+def backfill_battle_metrics() -> int:
+    """battle_metrics 채우기: 압축 인코딩된 상세 + 콜드 티어 묶음 (JSONB 행은 pack-details 를 먼저 실행)"""
+    import crud  # models 보다 먼저 로드되어야 함 (순환 import)
+    from crud.archive import _unpack
+    from models import BattleDetailArchive
+
+    with engine.begin() as conn:
+        total = conn.execute(text("""
+            INSERT INTO battle_metrics (battle_date, metric_id, owner_id, value)
+            SELECT d.battle_date, t.metric_id, m.owner_id, t.value
+            FROM battle_details d
+            JOIN battle_mains m ON m.battle_date = d.battle_date
+            CROSS JOIN LATERAL unnest(d.metric_ids, d.metric_values) AS t(metric_id, value)
+            WHERE d.metric_ids IS NOT NULL AND t.value IS NOT NULL
+            ON CONFLICT DO NOTHING
+        """)).rowcount
+    print(f"[Migration] inserted {total} metrics from battle_details")
+
+    db = SessionLocal()
+    try:
+        keys = db.query(BattleDetailArchive.owner_id, BattleDetailArchive.month_key).all()
+        for owner_id, month_key in keys:
+            archive = db.get(BattleDetailArchive, (owner_id, month_key))
+            if archive is None:
+                continue
+            rows = [
+                {"battle_date": battle_date, "metric_id": metric_id, "owner_id": archive.owner_id, "value": value}
+                for battle_date, packed in _unpack(archive.payload).items()
+                for metric_id, value in zip(packed["metric_ids"], packed["metric_values"])
+                if value is not None
+            ]
+            if rows:
+                # 보관 후 삭제된 기록은 battle_mains 에 없으므로 조인으로 걸러냄
+                result = db.execute(text("""
+                    INSERT INTO battle_metrics (battle_date, metric_id, owner_id, value)
+                    SELECT CAST(r.battle_date AS timestamp), r.metric_id, r.owner_id, r.value
+                    FROM jsonb_to_recordset(CAST(:rows AS jsonb))
+                         AS r(battle_date text, metric_id int, owner_id int, value float8)
+                    JOIN battle_mains m ON m.battle_date = CAST(r.battle_date AS timestamp)
+                    ON CONFLICT DO NOTHING
+                """), {"rows": json.dumps(rows)})
+                total += result.rowcount
+            db.commit()
+            db.expunge_all()
+        print(f"[Migration] inserted {total} metrics in total")
+    finally:
+        db.close()
+    return total
+
+def _median_ms(fn, repeat: int = 7) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return sorted(timings)[len(timings) // 2]
+
+def report_detail_sizes(sample: int = 1000):
+    """
+    행당 저장 크기 비교 (pg_column_size 는 TOAST 압축 후 크기).
+    JSONB 기준선: 최근 sample 개 압축 행을 예전 JSONB 4컬럼 형식으로 되돌려 임시 테이블에 넣고 같은 방식으로 측정.
+    읽기 시간은 둘 다 "SELECT + 화면용 dict 만들기" (압축 형식은 decode_detail 포함) 의 중앙값.
+    """
+    import detail_codec
+
+    columns = list(detail_codec.SECTION_COLUMNS.values())
+    with engine.connect() as conn:
+        row = conn.execute(text("""
+            SELECT
+                count(*) FILTER (WHERE metric_ids IS NULL) AS legacy_rows,
+                avg(coalesce(pg_column_size(combat_json), 0) + coalesce(pg_column_size(utility_json), 0)
+                    + coalesce(pg_column_size(enemy_json), 0) + coalesce(pg_column_size(bot_json), 0))
+                    FILTER (WHERE metric_ids IS NULL) AS legacy_avg_bytes,
+                count(*) FILTER (WHERE metric_ids IS NOT NULL) AS packed_rows,
+                avg(pg_column_size(metric_ids) + coalesce(pg_column_size(metric_values), 0)
+                    + coalesce(pg_column_size(metric_texts), 0))
+                    FILTER (WHERE metric_ids IS NOT NULL) AS packed_avg_bytes,
+                avg(coalesce(pg_column_size(metric_texts), 0))
+                    FILTER (WHERE metric_ids IS NOT NULL) AS texts_avg_bytes,
+                pg_total_relation_size('battle_details') AS table_bytes
+            FROM battle_details
+        """)).first()
+
+        packed_sql = text("""
+            SELECT battle_date, metric_ids, metric_values, metric_texts FROM battle_details
+            WHERE metric_ids IS NOT NULL ORDER BY battle_date DESC LIMIT :n
+        """)
+        packed = conn.execute(packed_sql, {"n": sample}).all()
+
+        # JSONB 기준선 (세션 임시 테이블 - 연결을 닫으면 사라짐)
+        conn.execute(text(
+            "CREATE TEMP TABLE detail_sizes_jsonb (battle_date timestamp PRIMARY KEY, "
+            + ", ".join(f"{c} jsonb" for c in columns) + ")"
+        ))
+        if packed:
+            conn.execute(
+                text("INSERT INTO detail_sizes_jsonb VALUES (:battle_date, "
+                     + ", ".join(f"CAST(:{c} AS jsonb)" for c in columns) + ")"),
+                [
+                    {"battle_date": r.battle_date,
+                     **{c: json.dumps(v, ensure_ascii=False) for c, v in detail_codec.decode_detail(conn, r).items()}}
+                    for r in packed
+                ]
+            )
+        baseline = conn.execute(text(
+            "SELECT count(*) AS rows, avg(" + " + ".join(f"coalesce(pg_column_size({c}), 0)" for c in columns) + ") AS avg_bytes, "
+            "pg_total_relation_size('detail_sizes_jsonb') AS table_bytes FROM detail_sizes_jsonb"
+        )).first()
+        sample_packed_bytes = conn.execute(text("""
+            SELECT avg(pg_column_size(metric_ids) + coalesce(pg_column_size(metric_values), 0)
+                       + coalesce(pg_column_size(metric_texts), 0))
+            FROM (SELECT * FROM battle_details WHERE metric_ids IS NOT NULL ORDER BY battle_date DESC LIMIT :n) s
+        """), {"n": sample}).scalar()
+
+        jsonb_ms = _median_ms(lambda: [
+            {c: getattr(r, c) or {} for c in columns}
+            for r in conn.execute(text("SELECT * FROM detail_sizes_jsonb ORDER BY battle_date DESC")).all()
+        ])
+        packed_ms = _median_ms(lambda: [
+            detail_codec.decode_detail(conn, r) for r in conn.execute(packed_sql, {"n": sample}).all()
+        ])
+        conn.rollback()
+
+    print(f"legacy : {row.legacy_rows} rows, avg {row.legacy_avg_bytes or 0:.0f} bytes")
+    print(f"packed : {row.packed_rows} rows, avg {row.packed_avg_bytes or 0:.0f} bytes (texts {row.texts_avg_bytes or 0:.0f})")
+    print(f"table  : {row.table_bytes / 1024 / 1024:.1f} MB (incl. TOAST, indexes)")
+    print(f"sample : latest {baseline.rows} packed details, same data in both formats")
+    print(f"  jsonb  avg {baseline.avg_bytes or 0:5.0f} bytes/row, read+build {jsonb_ms:6.1f} ms")
+    print(f"  packed avg {sample_packed_bytes or 0:5.0f} bytes/row, read+decode {packed_ms:6.1f} ms")
+
+def migrate():
+    import models
+    from database import Base
+    Base.metadata.create_all(bind=engine)
+    run_migrations()
+
+COMMANDS = {
+    "migrate": migrate,
+    "pack-details": pack_legacy_details,
+    "compact-texts": compact_metric_texts,
+    "detail-sizes": report_detail_sizes,
+    "backfill-numeric": backfill_numeric_columns,
+    "backfill-run-stats": backfill_run_stats,
+    "backfill-metrics": backfill_battle_metrics,
+}
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] not in COMMANDS:
+        print(f"usage: python migrations.py [{'|'.join(COMMANDS)}]")
+        sys.exit(1)
+    COMMANDS[sys.argv[1]]()
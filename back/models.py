@@ -1,10 +1,11 @@
 # back/models.py
-from sqlalchemy import Column, String, Integer, DateTime, BigInteger, ForeignKey, Text, Index
-from sqlalchemy.orm import relationship
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import Column, String, Integer, DateTime, BigInteger, ForeignKey, Text, Index, Float, UniqueConstraint, LargeBinary
+from sqlalchemy.orm import relationship, object_session
+from sqlalchemy.dialects.postgresql import JSONB, ARRAY
 from database import Base
 from datetime import datetime, timezone
 from crud.utils import parse_game_number_safe as parse_game_number
+import detail_codec
 
 class User(Base):
     __tablename__ = "users"
@@ -40,7 +41,7 @@ class BattleMain(Base):
         Index('idx_owner_date', 'owner_id', 'battle_date'),
     )
     
-    battle_date = Column(DateTime, primary_key=True, index=True)
+    battle_date = Column(DateTime, primary_key=True)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
     owner_id = Column(Integer, ForeignKey("users.id"))
@@ -60,16 +61,35 @@ class BattleMain(Base):
     damage_dealt = Column(String)
     damage_taken = Column(String)
 
+    # [Optimized] 정렬/필터용 숫자 컬럼 (원본 문자열은 표시용으로 유지)
+    game_time_seconds = Column(Integer, nullable=True)
+    real_time_seconds = Column(Integer, nullable=True)
+    damage_dealt_value = Column(Float, nullable=True)
+    damage_taken_value = Column(Float, nullable=True)
+
     notes = Column(Text, nullable=True)
 
+    # [New] 정규화된 원문 해시 (중복 제출 차단용, 도입 이전 행은 NULL)
+    content_hash = Column(String(64), nullable=True)
+
+    # 응답용 플래그 (컬럼 아님) - 중복 제출로 기존 기록을 돌려줄 때 True
+    duplicate = False
+
+    # 응답용 (컬럼 아님) - 내 같은 티어 평소 기록과의 비교 (crud/run_stats.py)
+    comparison = None
+
     detail = relationship("BattleDetail", back_populates="main", uselist=False, cascade="all, delete-orphan")
 
+    # 상세가 콜드 티어로 옮겨진 행에 목록 조회 시 붙여주는 값 (crud/archive.py)
+    archived_detail = None
+
     @property
     def top_damages(self):
-        if not self.detail or not self.detail.combat_json:
+        detail = self.detail or self.archived_detail
+        if not detail:
             return []
         
-        combat = self.detail.combat_json
+        combat = detail.section("combat_json")
         exclude_keys = ["입힌 대미지", "받은 대미지", "장벽이 받은 대미지", "회복 패키지", "생명력 흡수", "죽음 저항"]
         
         damage_list = []
@@ -91,9 +111,95 @@ class BattleDetail(Base):
     
     battle_date = Column(DateTime, ForeignKey("battle_mains.battle_date"), primary_key=True)
     
+    # [Legacy] 압축 인코딩 이전 행만 사용 (migrations.py pack-details 로 변환 후 NULL)
     combat_json = Column(JSONB)
     utility_json = Column(JSONB)
     enemy_json = Column(JSONB)
     bot_json = Column(JSONB)
+
+    # [Optimized] metric_keys 사전 id + 숫자값 + 원본 표기 (detail_codec.py 참고)
+    metric_ids = Column(ARRAY(Integer))
+    metric_values = Column(ARRAY(Float))
+    metric_texts = Column(ARRAY(Text))
     
-    main = relationship("BattleMain", back_populates="detail")
\ No newline at end of file
+    main = relationship("BattleMain", back_populates="detail")
+
+    def section(self, column: str) -> dict:
+        return detail_codec.decode_detail(object_session(self), self, [column])[column]
+
+# 상세 지표 키 사전 (섹션 + 한글 키 -> 정수 id)
+class MetricKey(Base):
+    __tablename__ = "metric_keys"
+    __table_args__ = (
+        UniqueConstraint('section', 'name', name='uq_metric_keys_section_name'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    section = Column(String, nullable=False)
+    name = Column(String, nullable=False)
+
+# [New] 상세 지표 숫자값 (지표별 검색/정렬용) - 인제스트 때 metric_values 에서 숫자인 것만 한 행씩 저장
+# 상세가 콜드 티어로 옮겨져도 남아 있고, battle_mains 삭제 시 DB 에서 CASCADE 로 같이 지워짐
+class BattleMetric(Base):
+    __tablename__ = "battle_metrics"
+    __table_args__ = (
+        Index('idx_battle_metrics_owner_metric_value', 'owner_id', 'metric_id', 'value'),
+    )
+
+    battle_date = Column(DateTime, ForeignKey("battle_mains.battle_date", ondelete="CASCADE"), primary_key=True)
+    metric_id = Column(Integer, ForeignKey("metric_keys.id"), primary_key=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    value = Column(Float, nullable=False)
+
+# [New] 콜드 티어 - 오래된 상세 데이터를 유저별/월별 zstd 압축 묶음으로 보관
+class BattleDetailArchive(Base):
+    __tablename__ = "battle_detail_archives"
+
+    owner_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    month_key = Column(String(7), primary_key=True)  # 예: "2023-12"
+
+    payload = Column(LargeBinary, nullable=False)
+    report_count = Column(Integer, default=0)
+    archived_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+# [New] 기록 변경 로그 (델타 동기화용) - id 가 곧 클라이언트의 동기화 버전
+class ReportChange(Base):
+    __tablename__ = "report_changes"
+    __table_args__ = (
+        Index('idx_report_changes_owner_id', 'owner_id', 'id'),
+    )
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    battle_date = Column(DateTime, nullable=False)
+    op = Column(String(8), nullable=False)  # "upsert" | "delete"
+    changed_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+# [New] 유저/티어/지표별 누적 통계 (제출 시 O(1) 로 갱신, 평균/분산 + 로그 구간 히스토그램)
+class UserTierStat(Base):
+    __tablename__ = "user_tier_stats"
+
+    owner_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    tier = Column(String, primary_key=True)
+    metric = Column(String(32), primary_key=True)
+
+    count = Column(Integer, nullable=False, default=0)
+    mean = Column(Float, nullable=False, default=0.0)
+    m2 = Column(Float, nullable=False, default=0.0)      # 편차 제곱합 (Welford)
+    sketch = Column(JSONB, nullable=False, default=dict) # 로그 구간 번호(str) -> 판 수
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+# [New] 스케줄러 작업 실행 이력 (리더 워커가 기록, 새 리더는 이걸 보고 다음 실행 시각을 이어받음)
+class JobRun(Base):
+    __tablename__ = "job_runs"
+    __table_args__ = (
+        Index('idx_job_runs_job_started', 'job', 'started_at'),
+    )
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    job = Column(String(64), nullable=False)
+    status = Column(String(16), nullable=False)  # running | ok | error | timeout
+    worker = Column(String(64))                  # 호스트명:pid
+    started_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+    result = Column(Text, nullable=True)         # 반환값 또는 오류 메시지
@@ -1,5 +1,19 @@
+import hashlib
 import re
 from datetime import datetime
+from crud.utils import parse_game_number_safe
+
+# 언어 판별 시 확인할 앞쪽 줄 수 (비어 있지 않은 줄 기준)
+DETECT_LINES = 5
+
+# '1d 2h 3m 4s' / '1일 2시간 3분 4초' 형식의 시간 단위 (초 환산)
+DURATION_UNITS = {
+    'd': 86400, '일': 86400,
+    'h': 3600, '시간': 3600,
+    'm': 60, '분': 60,
+    's': 1, '초': 1,
+}
+DURATION_RE = re.compile(r'(\d+)\s*(시간|일|분|초|d|h|m|s)')
 
 def parse_number(value_str: str):
     """
@@ -34,12 +48,281 @@ def parse_number(value_str: str):
     except ValueError:
         return 0
 
-def parse_battle_report(text: str) -> dict:
-    # 1. 텍스트 전처리
+def parse_duration(value_str: str):
+    """'1d 2h 3m 4s' -> 93784 (초). 해석할 수 없으면 None"""
+    if not value_str:
+        return None
+    matches = DURATION_RE.findall(value_str)
+    if not matches:
+        return None
+    return sum(int(num) * DURATION_UNITS[unit] for num, unit in matches)
+
+# 저장용 시간 표기 단위 (한국어 기준)
+CANONICAL_DURATION_UNITS = {'d': '일', 'h': '시간', 'm': '분', 's': '초', '일': '일', '시간': '시간', '분': '분', '초': '초'}
+
+def canonical_duration(value_str: str) -> str:
+    """'1d 2h 3m 4s' / '1일 2시간 3분 4초' -> '1일 2시간 3분 4초' (해석할 수 없으면 원문 그대로)"""
+    matches = DURATION_RE.findall(value_str or '')
+    if not matches:
+        return value_str
+    return ' '.join(f"{num}{CANONICAL_DURATION_UNITS[unit]}" for num, unit in matches)
+
+def report_content_hash(text: str) -> str:
+    """
+    중복 제출 판별용 해시. 줄바꿈 종류, 줄 앞뒤 공백, 탭/공백 차이, 빈 줄은 무시합니다.
+    (붙여넣는 곳에 따라 탭이 공백으로 바뀌는 경우가 있음)
+    """
+    lines = []
+    for line in text.replace('\r\n', '\n').replace('\r', '\n').split('\n'):
+        line = ' '.join(line.split())
+        if line:
+            lines.append(line)
+    return hashlib.sha256('\n'.join(lines).encode('utf-8')).hexdigest()
+
+class ReportGrammar:
+    """
+    한 언어의 전투 기록 문법 (섹션 헤더 / 키 이름 / 날짜 형식)
+    - main_keys: 기록 요약 키 -> BattleMain 필드 이름
+    - key_aliases: 상세 키 -> 저장용 표준 키 (저장/화면은 한국어 키 기준이므로 한국어 문법은 비어 있음)
+    - killer_aliases: 처치자 이름 -> 표준 이름 (처치자 필터/통계가 언어별로 갈라지지 않도록)
+    키 비교는 대소문자를 구분하지 않음 (클라이언트 버전마다 'Coins earned' / 'Coins Earned' 처럼 다름)
+    """
+    def __init__(self, code: str, markers, sections: dict, main_keys: dict, key_aliases: dict, date_parser,
+                 killer_aliases: dict = None):
+        self.code = code
+        self.markers = tuple(markers)
+        self.sections = sections
+        self.main_keys = {k.lower(): v for k, v in main_keys.items()}
+        self.key_aliases = {k.lower(): v for k, v in key_aliases.items()}
+        self.killer_aliases = {k.lower(): v for k, v in (killer_aliases or {}).items()}
+        self.parse_date = date_parser
+
+        # 탭 없이 붙여넣은 줄: 요약 섹션은 값에 공백이 있을 수 있어(날짜, 시간) 아는 키를 긴 것부터 맞춰보고,
+        # 상세 섹션은 값이 한 단어라서 마지막 공백 기준으로 분리
+        self.report_key_re = re.compile(
+            r'^(' + '|'.join(map(re.escape, sorted(main_keys, key=len, reverse=True))) + r')\s+(.+)$',
+            re.IGNORECASE
+        )
+
+    def main_field(self, key: str):
+        return self.main_keys.get(key.lower())
+
+    def canonical_key(self, key: str) -> str:
+        return self.key_aliases.get(key.lower(), key)
+
+    def canonical_killer(self, name: str) -> str:
+        return self.killer_aliases.get(name.lower(), name)
+
+    def split_line(self, line: str, section: str):
+        if '\t' in line:
+            parts = line.split('\t')
+            return parts[0].strip(), parts[-1].strip()
+        if section == 'report':
+            match = self.report_key_re.match(line)
+            if match:
+                return match.group(1), match.group(2).strip()
+        parts = line.rsplit(' ', 1)
+        if len(parts) == 2:
+            return parts[0].strip(), parts[1].strip()
+        return None, None
+
+KO_DATE_RE = re.compile(r'(\d+)월\s+(\d+),\s+(\d+)\s+(\d+):(\d+)')
+
+def _parse_ko_date(value: str):
+    match = KO_DATE_RE.match(value)
+    if not match:
+        return None
+    month, day, year, hour, minute = map(int, match.groups())
+    return datetime(year, month, day, hour, minute)
+
+EN_MONTHS = {m: i for i, m in enumerate(
+    ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'], 1
+)}
+EN_DATE_RE = re.compile(r'([A-Za-z]{3})[A-Za-z]*\.?\s+(\d+),\s+(\d+)\s+(\d+):(\d+)')
+
+def _parse_en_date(value: str):
+    match = EN_DATE_RE.match(value)
+    if not match or match.group(1).lower() not in EN_MONTHS:
+        return None
+    day, year, hour, minute = map(int, match.groups()[1:])
+    return datetime(year, EN_MONTHS[match.group(1).lower()], day, hour, minute)
+
+GRAMMARS = {
+    'ko': ReportGrammar(
+        code='ko',
+        markers=['전투 보고', '전투 날짜'],
+        sections={
+            '전투 보고': 'report',
+            '전투': 'combat',
+            '유틸리티': 'utility',
+            '적 파괴': 'enemy',
+            '봇': 'bot',
+            '가디언': 'bot',
+        },
+        main_keys={
+            '전투 날짜': 'battle_date',
+            '게임 시간': 'game_time',
+            '실시간': 'real_time',
+            '티어': 'tier',
+            '웨이브': 'wave',
+            '처치자': 'killer',
+            '코인 획득': 'coin_earned',
+            '시간당 코인': 'coins_per_hour',
+            '획득한 셀': 'cells_earned',
+            '다시 뽑기 파편 획득함': 'reroll_shards_earned',
+        },
+        key_aliases={},
+        date_parser=_parse_ko_date,
+    ),
+    # 영문 클라이언트: 키/처치자/시간 표기를 한국어 표준으로 바꿔서 저장 (metric_keys, battle_metrics, 처치자 필터가 언어별로 갈라지지 않도록)
+    # 표에 없는 키(새 게임 버전에서 추가된 항목 등)만 원문 그대로 저장
+    'en': ReportGrammar(
+        code='en',
+        markers=['Battle Report', 'Battle Date'],
+        sections={
+            'Battle Report': 'report',
+            'Combat': 'combat',
+            'Utility': 'utility',
+            'Enemies Destroyed': 'enemy',
+            'Bots': 'bot',
+            'Guardian': 'bot',
+        },
+        main_keys={
+            'Battle Date': 'battle_date',
+            'Game Time': 'game_time',
+            'Real Time': 'real_time',
+            'Tier': 'tier',
+            'Wave': 'wave',
+            'Killed By': 'killer',
+            'Coins Earned': 'coin_earned',
+            'Coins Per Hour': 'coins_per_hour',
+            'Cells Earned': 'cells_earned',
+            'Reroll Shards Earned': 'reroll_shards_earned',
+        },
+        key_aliases={
+            # 전투
+            'Damage Dealt': '입힌 대미지',
+            'Damage Taken': '받은 대미지',
+            'Damage Taken Wall': '장벽이 받은 대미지',
+            'Damage Taken While Berserked': '광폭화 중 받은 대미지',
+            'Damage Gain From Berserk': '광폭화로 얻은 대미지',
+            'Death Defy': '죽음 저항',
+            'Lifesteal': '생명력 흡수',
+            'Projectiles Damage': '투사체 대미지',
+            'Projectiles Count': '투사체 수',
+            'Thorn Damage': '가시 대미지',
+            'Orb Damage': '오브 대미지',
+            'Enemies Hit by Orbs': '오브에 맞은 적',
+            'Land Mine Damage': '지뢰 대미지',
+            'Land Mines Spawned': '생성된 지뢰',
+            'Rend Armor Damage': '방어구 가르기 대미지',
+            'Death Ray Damage': '죽음의 광선 대미지',
+            'Smart Missile Damage': '스마트 미사일 대미지',
+            'Inner Land Mine Damage': '내부 지뢰 대미지',
+            'Chain Lightning Damage': '연쇄 번개 대미지',
+            'Death Wave Damage': '죽음의 파동 대미지',
+            'Tagged by Deathwave': '죽음의 파동에 표시된 적',
+            'Swamp Damage': '늪 대미지',
+            'Black Hole Damage': '블랙홀 대미지',
+            'Electrons Damage': '전자 대미지',
+            # 유틸리티
+            'Waves Skipped': '건너뛴 웨이브',
+            'Recovery Packages': '회복 패키지',
+            'Free Attack Upgrade': '무료 공격 업그레이드',
+            'Free Defense Upgrade': '무료 방어 업그레이드',
+            'Free Utility Upgrade': '무료 유틸리티 업그레이드',
+            'HP From Death Wave': '죽음의 파동으로 얻은 체력',
+            'Coins From Death Wave': '죽음의 파동으로 획득한 코인',
+            'Cash From Golden Tower': '황금 타워로 획득한 캐시',
+            'Coins From Golden Tower': '황금 타워로 획득한 코인',
+            'Coins From Black Hole': '블랙홀로 획득한 코인',
+            'Coins From Spotlight': '스포트라이트로 획득한 코인',
+            'Coins From Orb': '오브로 획득한 코인',
+            'Coins from Coin Upgrade': '코인 업그레이드로 얻은 코인',
+            'Coins from Coin Bonuses': '코인 보너스로 얻은 코인',
+            # 적 파괴
+            'Total Enemies': '적 합계',
+            'Basic': '기본',
+            'Fast': '신속',
+            'Tank': '탱킹',
+            'Ranged': '원거리',
+            'Boss': '보스',
+            'Protector': '수호자',
+            'Total Elites': '총 엘리트',
+            'Vampires': '뱀파이어',
+            'Rays': '광선',
+            'Scatters': '스캐터',
+            'Saboteur': '파괴 공작원',
+            'Commander': '지휘관',
+            'Overcharge': '과전하',
+            'Destroyed By Orbs': '오브로 파괴',
+            'Destroyed by Thorns': '가시로 파괴',
+            'Destroyed by Death Ray': '죽음의 광선으로 파괴',
+            'Destroyed by Land Mine': '지뢰로 파괴',
+            'Destroyed in Spotlight': '스포트라이트에서 파괴',
+            # 봇
+            'Flame Bot Damage': '불꽃 봇 대미지',
+            'Thunder Bot Stuns': '천둥 봇 기절',
+            'Golden Bot Coins Earned': '황금 봇으로 획득한 코인',
+            'Destroyed in Golden Bot': '황금 봇에서 파괴',
+            # 가디언
+            'Damage': '대미지',
+            'Summoned Enemies': '소환된 적',
+            'Guardian Coins Stolen': '가디언이 훔친 코인',
+            'Coins Fetched': '가져온 코인',
+            'Gems': '보석',
+            'Medals': '메달',
+            'Reroll Shards': '다시 뽑기 파편',
+            'Cannon Shards': '대포 파편',
+            'Armor Shards': '갑옷 파편',
+            'Generator Shards': '발전기 파편',
+            'Core Shards': '코어 파편',
+            'Common Modules': '공통 모듈',
+            'Rare Modules': '희귀 모듈',
+        },
+        # 처치자는 단수형 적 이름
+        killer_aliases={
+            'Basic': '기본',
+            'Fast': '신속',
+            'Tank': '탱킹',
+            'Ranged': '원거리',
+            'Boss': '보스',
+            'Protector': '수호자',
+            'Vampire': '뱀파이어',
+            'Ray': '광선',
+            'Scatter': '스캐터',
+            'Saboteur': '파괴 공작원',
+            'Commander': '지휘관',
+            'Overcharge': '과전하',
+        },
+        date_parser=_parse_en_date,
+    ),
+}
+
+def detect_grammar(lines) -> ReportGrammar:
+    """앞쪽 몇 줄의 헤더/첫 키로 언어 판별"""
+    checked = 0
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        for grammar in GRAMMARS.values():
+            if line.startswith(grammar.markers):
+                return grammar
+        checked += 1
+        if checked >= DETECT_LINES:
+            break
+    raise ValueError("지원하지 않는 전투 기록 형식입니다. (한국어/영어 전투 보고만 지원)")
+
+def parse_battle_report(text: str, locale: str = None) -> dict:
+    # 1. 텍스트 전처리 + 언어 판별
     clean_text = text.replace('\r\n', '\n').replace('\r', '\n')
     lines = clean_text.split('\n')
+    if locale and locale not in GRAMMARS:
+        raise ValueError(f"Unknown locale: {locale}")
+    grammar = GRAMMARS[locale] if locale else detect_grammar(lines)
     
-    # 2. 데이터를 담을 임시 저장소
+    # 2. 데이터를 담을 임시 저장소 (report 는 BattleMain 필드 이름, 나머지는 표준 키로 저장)
     sections = {
         'report': {},   # 전투 보고
         'combat': {},   # 전투
@@ -48,86 +331,61 @@ def parse_battle_report(text: str) -> dict:
         'bot': {},      # 봇 + 가디언
     }
     
-    current_section = 'report' 
-    
-    section_map = {
-        '전투 보고': 'report',
-        '전투': 'combat',
-        '유틸리티': 'utility',
-        '적 파괴': 'enemy',
-        '봇': 'bot',
-        '가디언': 'bot'
-    }
-
-    print("--- [Section Parser] 시작 ---")
+    current_section = 'report'
 
     for line in lines:
         line = line.strip()
         if not line: continue
         
         # 1) 섹션 헤더 확인
-        if line in section_map:
-            current_section = section_map[line]
+        section = grammar.sections.get(line)
+        if section:
+            current_section = section
             continue
             
         # 2) 데이터 파싱 (Key-Value 분리)
-        key = None
-        val = None
-        
-        if '\t' in line:
-            parts = line.split('\t')
-            key = parts[0].strip()
-            val = parts[-1].strip()
+        key, val = grammar.split_line(line, current_section)
+        if not (key and val):
+            continue
+
+        if current_section == 'report':
+            field = grammar.main_field(key)
+            if field:
+                sections['report'][field] = val
         else:
-            # 예외 처리: 공백이 포함된 키값들
-            if current_section == 'report':
-                for special_key in ["전투 날짜", "게임 시간", "실시간", "시간당 코인"]:
-                    if line.startswith(special_key):
-                        key = special_key
-                        val = line.replace(special_key, "", 1).strip()
-                        break
-            
-            # 위 예외에 안 걸리면 일반 처리
-            if not key:
-                parts = line.rsplit(' ', 1)
-                if len(parts) == 2:
-                    key = parts[0].strip()
-                    val = parts[1].strip()
-        
-        if key and val:
-            sections[current_section][key] = val
+            sections[current_section][grammar.canonical_key(key)] = val
 
     # 3. 최종 데이터 조립
     repo = sections['report']
     comb = sections['combat']
     
-    date_str = repo.get('전투 날짜', '')
-    try:
-        match = re.match(r'(\d+)월\s+(\d+),\s+(\d+)\s+(\d+):(\d+)', date_str)
-        if match:
-            month, day, year, hour, minute = match.groups()
-            battle_date = datetime(int(year), int(month), int(day), int(hour), int(minute))
-        else:
-            battle_date = datetime.now()
-    except:
-        battle_date = datetime.now()
+    # 날짜는 기록의 기본 키라서 해석하지 못하면 저장하지 않음 (현재 시각으로 대체하면 다른 기록을 덮어쓸 수 있음)
+    battle_date = grammar.parse_date(repo.get('battle_date', ''))
+    if battle_date is None:
+        raise ValueError("전투 날짜를 찾을 수 없습니다.")
 
     main_data = {
         'battle_date': battle_date,
-        'tier': repo.get('티어', 'T1'),
-        'wave': int(repo.get('웨이브', '0').replace(',', '')),
-        'game_time': repo.get('게임 시간', ''),
-        'real_time': repo.get('실시간', ''),
+        'tier': repo.get('tier', 'T1'),
+        'wave': int(repo.get('wave', '0').replace(',', '')),
+        'game_time': canonical_duration(repo.get('game_time', '')),
+        'real_time': canonical_duration(repo.get('real_time', '')),
         
-        'coin_earned': parse_number(repo.get('코인 획득', '0')),
-        'coins_per_hour': parse_number(repo.get('시간당 코인', '0')),
-        'cells_earned': parse_number(repo.get('획득한 셀', '0')),
-        'reroll_shards_earned': parse_number(repo.get('다시 뽑기 파편 획득함', '0')),
+        'coin_earned': parse_number(repo.get('coin_earned', '0')),
+        'coins_per_hour': parse_number(repo.get('coins_per_hour', '0')),
+        'cells_earned': parse_number(repo.get('cells_earned', '0')),
+        'reroll_shards_earned': parse_number(repo.get('reroll_shards_earned', '0')),
         
-        'killer': repo.get('처치자', ''),
+        'killer': grammar.canonical_killer(repo.get('killer', '')),
         'damage_dealt': comb.get('입힌 대미지', '0'),
         'damage_taken': comb.get('받은 대미지', '0'),
     }
+
+    # 정렬/필터용 숫자 컬럼
+    main_data['game_time_seconds'] = parse_duration(main_data['game_time'])
+    main_data['real_time_seconds'] = parse_duration(main_data['real_time'])
+    main_data['damage_dealt_value'] = parse_game_number_safe(main_data['damage_dealt'])
+    main_data['damage_taken_value'] = parse_game_number_safe(main_data['damage_taken'])
     
     detail_data = {
         'combat_json': sections['combat'],
@@ -136,4 +394,4 @@ def parse_battle_report(text: str) -> dict:
         'bot_json': sections['bot'],
     }
 
-    return {'main': main_data, 'detail': detail_data}
\ No newline at end of file
+    return {'main': main_data, 'detail': detail_data, 'locale': grammar.code}
\ No newline at end of file
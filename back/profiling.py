@@ -0,0 +1,237 @@
+# back/profiling.py
+# 운영 요청용 샘플링 프로파일러 (기본 꺼짐)
+# - PROFILE_SAMPLE_RATE 비율의 요청, 또는 관리자 서명 헤더(X-Profile)가 붙은 요청만 프로파일링
+# - 요청이 끝날 때까지 이벤트 루프 스레드 + AnyIO 워커 스레드(동기 엔드포인트 실행)의 스택을 주기적으로 수집
+# - 결과는 folded stack 형식(flamegraph.pl / speedscope 에서 바로 열림)으로 PROFILE_DIR 에 개수 제한을 두고 저장
+#   (gunicorn 워커들이 같은 디렉터리를 공유하므로 어느 워커로 조회해도 같은 목록이 보임)
+import hashlib
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from jose import JWTError, jwt
+from dotenv import load_dotenv
+
+from auth import SECRET_KEY, ALGORITHM
+
+load_dotenv()
+
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "/tmp/thetower-profiles"))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "200"))
+
+PROFILE_HEADER = b"x-profile"
+# 장시간 열려 있는 스트림이나 프로파일 조회 자체는 대상에서 제외
+EXCLUDED_PREFIXES = ("/api/events", "/api/admin/profiles")
+
+# 대기 중인 스레드(요청을 처리하지 않는 중)는 마지막 프레임이 이 파일들 안에 있음
+IDLE_FILES = ("threading.py", "selectors.py", "queue.py")
+WORKER_THREAD_NAME = "AnyIO worker thread"
+
+# 1. 관리자 서명 헤더: "<만료 unix 초>.<HMAC-SHA256(PROFILE_ADMIN_TOKEN, 만료)>"
+def sign_profile_header(valid_minutes: int = 10) -> str:
+    expires = int(time.time()) + valid_minutes * 60
+    signature = hmac.new(PROFILE_ADMIN_TOKEN.encode(), str(expires).encode(), hashlib.sha256).hexdigest()
+    return f"{expires}.{signature}"
+
+def verify_profile_header(value: str) -> bool:
+    if not PROFILE_ADMIN_TOKEN or not value:
+        return False
+    expires, _, signature = value.partition(".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    expected = hmac.new(PROFILE_ADMIN_TOKEN.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+# 2. 스택 샘플러
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    # folded 형식의 구분자(;)와 공백이 이름에 섞이지 않도록 정리
+    name = f"{code.co_qualname}({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    return name.replace(";", ":").replace(" ", "_")
+
+def _stack_of(frame) -> list:
+    stack = []
+    while frame is not None:
+        stack.append(frame)
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+class StackSampler:
+    """한 번에 하나의 요청만 프로파일링 (동시에 여러 개를 돌리면 오버헤드와 스택 섞임이 커짐)"""
+    def __init__(self, loop_thread_id: int, interval: float):
+        self.loop_thread_id = loop_thread_id
+        self.interval = interval
+        self.stacks = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _watched_threads(self) -> set:
+        ids = {self.loop_thread_id}
+        for t in threading.enumerate():
+            if t.name == WORKER_THREAD_NAME:
+                ids.add(t.ident)
+        return ids
+
+    def _sample(self):
+        watched = self._watched_threads()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id not in watched:
+                continue
+            if os.path.basename(frame.f_code.co_filename) in IDLE_FILES:
+                continue
+            thread = "event-loop" if thread_id == self.loop_thread_id else "worker"
+            key = ";".join([thread] + [_frame_name(f) for f in _stack_of(frame)])
+            self.stacks[key] = self.stacks.get(key, 0) + 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+# 3. 저장소 (파일 하나 = 프로파일 하나, 오래된 것부터 삭제)
+def _profile_path(profile_id: str) -> Path:
+    return PROFILE_DIR / f"{profile_id}.json"
+
+def save_profile(meta: dict, stacks: dict):
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = PROFILE_DIR / f".{meta['id']}.tmp"
+    tmp.write_text(json.dumps({"meta": meta, "stacks": stacks}, ensure_ascii=False), encoding="utf-8")
+    tmp.replace(_profile_path(meta["id"]))
+
+    files = sorted(PROFILE_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime)
+    for old in files[:-PROFILE_MAX_FILES]:
+        old.unlink(missing_ok=True)
+
+def list_profiles(limit: int = 50) -> list:
+    if not PROFILE_DIR.exists():
+        return []
+    files = sorted(PROFILE_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+    profiles = []
+    for path in files[:limit]:
+        try:
+            profiles.append(json.loads(path.read_text(encoding="utf-8"))["meta"])
+        except (OSError, ValueError, KeyError):
+            continue  # 다른 워커가 정리 중인 파일
+    return profiles
+
+def load_profile(profile_id: str):
+    # 경로 조작 방지: uuid 형식만 허용
+    try:
+        uuid.UUID(profile_id)
+    except ValueError:
+        return None
+    path = _profile_path(profile_id)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+def to_folded(stacks: dict) -> str:
+    return "\n".join(f"{stack} {count}" for stack, count in sorted(stacks.items())) + "\n"
+
+# 4. ASGI 미들웨어
+def _username_from_scope(scope) -> str:
+    for name, value in scope.get("headers", []):
+        if name == b"authorization" and value.lower().startswith(b"bearer "):
+            try:
+                return jwt.decode(value[7:].decode(), SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+            except JWTError:
+                return None
+    return None
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self._busy = threading.Lock()
+        self._in_flight = 0
+
+    def _should_profile(self, scope) -> str:
+        if scope["path"].startswith(EXCLUDED_PREFIXES):
+            return None
+        for name, value in scope.get("headers", []):
+            if name == PROFILE_HEADER and verify_profile_header(value.decode()):
+                return "header"
+        if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        self._in_flight += 1
+        reason = self._should_profile(scope)
+        if not reason or not self._busy.acquire(blocking=False):
+            try:
+                return await self.app(scope, receive, send)
+            finally:
+                self._in_flight -= 1
+
+        max_concurrent = self._in_flight
+        status_code = None
+        started_at = datetime.now(timezone.utc)
+        started = time.perf_counter()
+        sampler = StackSampler(threading.get_ident(), PROFILE_INTERVAL_MS / 1000)
+        sampler.start()
+
+        async def send_wrapper(message):
+            nonlocal status_code, max_concurrent
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            max_concurrent = max(max_concurrent, self._in_flight)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self._in_flight -= 1
+            sampler.stop()
+            self._busy.release()
+            duration_ms = (time.perf_counter() - started) * 1000
+
+            route = scope.get("route")
+            meta = {
+                "id": str(uuid.uuid4()),
+                "reason": reason,
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(route, "path", scope["path"]),
+                "user": _username_from_scope(scope),
+                "status": status_code,
+                "started_at": started_at.isoformat(),
+                "duration_ms": round(duration_ms, 1),
+                "samples": sampler.samples,
+                "interval_ms": PROFILE_INTERVAL_MS,
+                # 1 보다 크면 같은 워커의 다른 요청 스택이 섞였을 수 있음
+                "concurrent_requests": max_concurrent,
+            }
+            try:
+                save_profile(meta, sampler.stacks)
+            except Exception as e:
+                print(f"[Profiling] Save Error: {e}")
+
+# CLI: python profiling.py sign [유효 분] -> X-Profile 헤더 값 출력
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "sign" or not PROFILE_ADMIN_TOKEN:
+        print("Usage: PROFILE_ADMIN_TOKEN=... python profiling.py sign [minutes]")
+        sys.exit(1)
+    minutes = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    print(sign_profile_header(minutes))
+    print(f"(valid until {(datetime.now(timezone.utc) + timedelta(minutes=minutes)).isoformat()})")
@@ -0,0 +1,114 @@
+# back/ratelimit.py
+# 유저 + 라우트 단위 토큰 버킷 레이트 리밋
+# REDIS_URL 이 설정되어 있으면 모든 워커가 Redis 의 버킷을 공유하고,
+# 없거나 Redis 장애 시에는 워커별 인메모리 버킷으로 동작합니다 (이 경우 한도는 워커 수만큼 느슨해짐).
+import math
+import os
+import threading
+import time
+from fastapi import Depends, HTTPException, status
+from jose import JWTError, jwt
+from dotenv import load_dotenv
+
+from auth import oauth2_scheme, SECRET_KEY, ALGORITHM
+
+load_dotenv()
+
+REDIS_URL = os.getenv("REDIS_URL")
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# KEYS[1]=버킷 키, ARGV = 초당 충전량, 최대 토큰, 현재 시각
+_REDIS_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(data[1]) or burst
+local ts = tonumber(data[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+class LocalBuckets:
+    def __init__(self):
+        self._buckets = {}  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: int):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated_at) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+
+            # 10분 이상 안 쓴 버킷 정리 (그 사이 이미 가득 찼으므로 없는 것과 같음)
+            if len(self._buckets) > 10000:
+                self._buckets = {
+                    k: v for k, v in self._buckets.items()
+                    if now - v[1] < 600
+                }
+        return allowed, tokens
+
+class RedisBuckets:
+    def __init__(self, url: str):
+        self._client = redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+        self._script = self._client.register_script(_REDIS_BUCKET_SCRIPT)
+
+    def take(self, key: str, rate: float, burst: int):
+        allowed, tokens = self._script(keys=[key], args=[rate, burst, time.time()])
+        return bool(allowed), float(tokens)
+
+_local = LocalBuckets()
+_shared = RedisBuckets(REDIS_URL) if (REDIS_URL and redis) else None
+
+def take_token(key: str, rate: float, burst: int):
+    if _shared:
+        try:
+            return _shared.take(key, rate, burst)
+        except Exception as e:
+            print(f"[RateLimit] Redis Error, using local buckets: {e}")
+    return _local.take(key, rate, burst)
+
+class RateLimit:
+    """
+    라우트 의존성으로 사용: Depends(RateLimit("reports:create", per_minute=20, burst=10))
+    토큰의 sub(유저명)로 버킷을 나누므로 DB 조회 전에 차단됩니다.
+    """
+    def __init__(self, route: str, per_minute: float, burst: int):
+        self.route = route
+        self.rate = per_minute / 60
+        self.burst = burst
+
+    def __call__(self, token: str = Depends(oauth2_scheme)):
+        if not RATE_LIMIT_ENABLED:
+            return
+        try:
+            username = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+        except JWTError:
+            return  # 잘못된 토큰은 get_current_user 에서 401 처리
+        if not username:
+            return
+
+        allowed, tokens = take_token(f"rl:{self.route}:{username}", self.rate, self.burst)
+        if not allowed:
+            retry_after = math.ceil((1 - tokens) / self.rate)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="요청이 너무 많습니다. 잠시 후 다시 시도해주세요.",
+                headers={"Retry-After": str(max(retry_after, 1))},
+            )
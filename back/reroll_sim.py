@@ -0,0 +1,156 @@
+# back/reroll_sim.py
+# 모듈 부옵션 리롤 비용 계산기 (프론트 useRerollSimulation 의 서버 버전)
+#
+# 규칙 (프론트 시뮬레이션과 동일):
+#  - 활성 슬롯 = 목표 옵션 + 이미 잠근 옵션, 잠기지 않은 슬롯만 매번 다시 뽑음
+#  - 1회 비용 = reroll_costs[현재 잠금 수]
+#  - 슬롯마다 등급을 뽑고(목표 등급 초과는 목표 등급으로 고정), 그 등급에 존재하는 옵션 중
+#    (잠긴/금지 옵션 제외) 하나를 균등하게 뽑음. 목표 옵션이 목표 등급으로 나오면 잠금
+#  - 한 번의 리롤에서 같은 목표가 여러 슬롯에 나오면 하나만 잠금 (모듈 옵션은 중복 불가)
+#
+# 남은 목표 수 R 만 상태로 갖는 마르코프 체인이 되므로
+#  - 기대 비용/횟수는 체인에서 정확히 계산하고
+#  - 분포는 상태별 체류 횟수(기하분포)와 점프 크기를 NumPy 로 한꺼번에 샘플링합니다.
+from functools import lru_cache
+from math import comb
+import numpy as np
+import catalog
+
+# 카탈로그(game_data/module_reroll.json)와 같은 데이터 - /api/catalog/module_reroll 로도 제공
+REROLL_DATA = catalog.get("module_reroll")
+
+RARITY_CHANCES = REROLL_DATA["rarity_chances"]   # % (Common ~ Ancestral)
+REROLL_COSTS = REROLL_DATA["reroll_costs"]       # 잠금 수 -> 1회 비용
+MAX_SLOTS = len(REROLL_COSTS)
+
+def _build_chain(module_type: str, targets: tuple, locked: tuple, banned: tuple, rarity_cap: int):
+    """남은 목표 수 R 별 (1회 비용, 머무를 확률, j개 잠길 확률 배열)"""
+    effects = REROLL_DATA["effects"].get(module_type)
+    if effects is None:
+        raise ValueError(f"Unknown module type: {module_type}")
+    by_id = {e["id"]: e for e in effects}
+
+    unknown = [i for i in targets + locked + banned if i not in by_id]
+    if unknown:
+        raise ValueError(f"Unknown effects: {', '.join(unknown)}")
+    unreachable = [t for t in targets if by_id[t]["values"][rarity_cap] is None]
+    if unreachable:
+        raise ValueError(f"Effects not available at target rarity: {', '.join(unreachable)}")
+    if len(set(targets) | set(locked)) > MAX_SLOTS:
+        raise ValueError(f"At most {MAX_SLOTS} slots")
+
+    remaining = [t for t in targets if t not in locked]
+    hit_rate = sum(RARITY_CHANCES[rarity_cap:]) / 100  # 슬롯이 목표 등급으로 나올 확률
+    pool = sum(
+        1 for e in effects
+        if e["values"][rarity_cap] is not None and e["id"] not in locked and e["id"] not in banned
+    )
+
+    chain = {}
+    r0 = len(remaining)
+    for r in range(r0, 0, -1):
+        found = r0 - r
+        a = hit_rate / (pool - found)   # 한 슬롯이 특정 목표를 뽑을 확률
+        u = r                           # 잠기지 않은 슬롯 수 = 남은 목표 수
+
+        # 정확히 j 개의 서로 다른 목표가 나올 확률 (포함-배제)
+        probs = np.array([
+            comb(r, j) * sum((-1) ** (j - i) * comb(j, i) * (1 - (r - i) * a) ** u for i in range(j + 1))
+            for j in range(r + 1)
+        ])
+        probs = np.clip(probs, 0, None)
+        probs /= probs.sum()
+
+        chain[r] = (REROLL_COSTS[len(locked) + found], probs[0], probs[1:])
+    return r0, chain
+
+def _expected(r0: int, chain: dict):
+    cost = {0: 0.0}
+    rolls = {0: 0.0}
+    for r in range(1, r0 + 1):
+        unit_cost, stay, jumps = chain[r]
+        leave = 1 - stay
+        cost[r] = (unit_cost + sum(p * cost[r - j] for j, p in enumerate(jumps, 1))) / leave
+        rolls[r] = (1 + sum(p * rolls[r - j] for j, p in enumerate(jumps, 1))) / leave
+    return cost[r0], rolls[r0]
+
+def _sample(r0: int, chain: dict, trials: int):
+    rng = np.random.default_rng(0)
+    state = np.full(trials, r0)
+    total = np.zeros(trials)
+
+    # 상태는 줄어들기만 하므로 R 내림차순으로 한 번씩만 처리하면 됨
+    for r in range(r0, 0, -1):
+        idx = np.flatnonzero(state == r)
+        if idx.size == 0:
+            continue
+        unit_cost, stay, jumps = chain[r]
+        total[idx] += rng.geometric(1 - stay, size=idx.size) * unit_cost
+        state[idx] = r - rng.choice(np.arange(1, r + 1), size=idx.size, p=jumps / jumps.sum())
+    return total
+
+@lru_cache(maxsize=256)
+def simulate(module_type: str, targets: tuple, locked: tuple = (), banned: tuple = (),
+             rarity_cap: int = 5, trials: int = 200_000, bins: int = 20) -> dict:
+    """인자는 캐시 키가 되므로 정렬된 튜플로 넘길 것 (simulate_reroll 사용)"""
+    r0, chain = _build_chain(module_type, targets, locked, banned, rarity_cap)
+    if r0 == 0:
+        return {
+            "expected_cost": 0.0, "expected_rolls": 0.0, "trials": 0,
+            "percentiles": {"p50": 0.0, "p90": 0.0, "p99": 0.0}, "histogram": []
+        }
+
+    expected_cost, expected_rolls = _expected(r0, chain)
+    costs = _sample(r0, chain, trials)
+    p50, p90, p99 = np.percentile(costs, [50, 90, 99])
+
+    # 상위 1% 꼬리는 마지막 구간에 합침
+    counts, edges = np.histogram(np.minimum(costs, p99), bins=bins, range=(0, p99))
+    histogram = [
+        {"cost_upper": float(edges[i + 1]), "probability": float(counts[i] / trials)}
+        for i in range(bins)
+    ]
+
+    return {
+        "expected_cost": float(expected_cost),
+        "expected_rolls": float(expected_rolls),
+        "trials": trials,
+        "percentiles": {"p50": float(p50), "p90": float(p90), "p99": float(p99)},
+        "histogram": histogram
+    }
+
+def simulate_reroll(module_type: str, targets, locked=(), banned=(), rarity_cap: int = 5, trials: int = 200_000) -> dict:
+    return simulate(
+        module_type,
+        tuple(sorted(set(targets))),
+        tuple(sorted(set(locked))),
+        tuple(sorted(set(banned))),
+        rarity_cap,
+        trials
+    )
+
+def locked_effects_from_modules(user_modules, module_type: str, slot: str = "main") -> list:
+    """
+    저장된 장착 모듈의 부옵션 id 목록.
+    equipped_json["equipped_{종류}_{main|sub}"] = {name, rarity, effects} (ModulesInfoPage 저장 형식),
+    장착 데이터에 effects 가 없으면 inventory_json[name].effects 사용
+    """
+    if not user_modules:
+        return []
+    equipped = (user_modules.equipped_json or {}).get(f"equipped_{module_type}_{slot}")
+    if isinstance(equipped, str):
+        equipped = {"name": equipped}
+    if not isinstance(equipped, dict):
+        return []
+
+    effects = equipped.get("effects")
+    if not effects:
+        owned = (user_modules.inventory_json or {}).get(equipped.get("name"))
+        effects = owned.get("effects") if isinstance(owned, dict) else None
+
+    result = []
+    for effect in effects or []:
+        effect_id = effect.get("id") if isinstance(effect, dict) else effect
+        if isinstance(effect_id, str):
+            result.append(effect_id)
+    return result
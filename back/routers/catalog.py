@@ -0,0 +1,45 @@
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+import catalog
+
+# 공개 정적 데이터라서 인증 없음
+router = APIRouter(prefix="/api/catalog", tags=["catalog"])
+
+# 해시 URL 은 내용이 바뀌면 URL 자체가 바뀌므로 1년 + immutable
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+# 매니페스트/최신 섹션은 매번 ETag 로 재검증 (바뀌지 않았으면 304)
+REVALIDATE_CACHE = "public, no-cache"
+
+def _not_modified(request: Request, etag: str) -> bool:
+    return etag in (request.headers.get("if-none-match") or "")
+
+def _section_response(request: Request, section: catalog.CatalogSection, cache_control: str) -> Response:
+    headers = {"ETag": section.etag, "Cache-Control": cache_control}
+    if _not_modified(request, section.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=section.body, media_type="application/json", headers=headers)
+
+# 매니페스트: 섹션별 해시 URL 목록
+@router.get("/")
+def get_catalog_manifest(request: Request):
+    etag = f'"{catalog.VERSION}"'
+    headers = {"ETag": etag, "Cache-Control": REVALIDATE_CACHE}
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(catalog.manifest(router.prefix), headers=headers)
+
+# 최신 섹션 (해시를 모를 때)
+@router.get("/{name}")
+def get_catalog_section(name: str, request: Request):
+    section = catalog.SECTIONS.get(name)
+    if not section:
+        raise HTTPException(status_code=404, detail="Unknown catalog section")
+    return _section_response(request, section, REVALIDATE_CACHE)
+
+# 해시 고정 섹션 (장기 캐시). 예전 해시로 요청하면 404 -> 클라이언트는 매니페스트를 다시 받음
+@router.get("/{name}/{content_hash}")
+def get_catalog_section_version(name: str, content_hash: str, request: Request):
+    section = catalog.SECTIONS.get(name)
+    if not section or section.hash != content_hash:
+        raise HTTPException(status_code=404, detail="Unknown catalog section version")
+    return _section_response(request, section, IMMUTABLE_CACHE)
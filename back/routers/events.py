@@ -0,0 +1,46 @@
+import asyncio
+import json
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+from database import SessionLocalRead
+from auth import get_user_from_token
+import events
+
+router = APIRouter(prefix="/api/events", tags=["events"])
+
+HEARTBEAT_SECONDS = 15
+
+async def _event_stream(request: Request, user_id: int):
+    async with events.hub.subscribe(user_id) as queue:
+        yield "retry: 5000\n\n"
+        while True:
+            if await request.is_disconnected():
+                break
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                # 프록시가 유휴 연결을 끊지 않도록 주석 라인 전송
+                yield ": ping\n\n"
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+
+# 실시간 이벤트 스트림 (SSE)
+# EventSource 는 Authorization 헤더를 보낼 수 없어서 토큰을 쿼리로 받음
+@router.get("/stream")
+def stream_events(request: Request, token: str):
+    # 스트림이 열려 있는 동안 DB 커넥션을 잡고 있지 않도록 인증 직후 바로 반납
+    db = SessionLocalRead()
+    try:
+        user = get_user_from_token(db, token)
+        user_id = user.id
+    finally:
+        db.close()
+
+    return StreamingResponse(
+        _event_stream(request, user_id),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        },
+    )
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from database import get_db_read
+from schemas import LeaderboardResponse, RunPercentileResponse
+import crud
+from datetime import datetime
+from models import User
+from auth import get_current_user
+
+router = APIRouter(prefix="/api/leaderboard", tags=["leaderboard"])
+
+# 특정 판의 티어 내 백분위 (상세 페이지용)
+@router.get("/percentile/{battle_date}", response_model=RunPercentileResponse)
+def get_run_percentile_api(
+    battle_date: str,
+    db: Session = Depends(get_db_read),
+    current_user: User = Depends(get_current_user)
+):
+    try:
+        date_obj = datetime.fromisoformat(battle_date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format")
+
+    result = crud.get_run_percentile(db, date_obj, current_user.id)
+    if not result:
+        raise HTTPException(status_code=404, detail="Report not found")
+    return result
+
+# 티어별 리더보드
+@router.get("/{tier}", response_model=LeaderboardResponse)
+def get_tier_leaderboard_api(
+    tier: str,
+    metric: str = "wave",
+    limit: int = 50,
+    db: Session = Depends(get_db_read),
+    current_user: User = Depends(get_current_user)
+):
+    if metric not in crud.leaderboard.LEADERBOARD_METRICS:
+        raise HTTPException(status_code=400, detail="Invalid metric. Use wave or coins_per_hour")
+
+    return crud.get_tier_leaderboard(db, tier, current_user.id, metric=metric, limit=min(limit, 100))
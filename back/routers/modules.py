@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from database import get_db, get_db_read
 import schemas, crud
 from models import User
 from auth import get_current_user
+import reroll_sim
 
 router = APIRouter(prefix="/api/modules", tags=["modules"])
 
@@ -28,4 +29,34 @@ def save_my_modules(
         current_user.id, 
         data.inventory_json, 
         data.equipped_json
-    )
\ No newline at end of file
+    )
+
+# 리롤 비용 시뮬레이션 (같은 설정은 워커 메모리에 캐시)
+@router.post("/reroll-simulation", response_model=schemas.RerollSimulationResponse)
+def simulate_reroll(
+    data: schemas.RerollSimulationRequest,
+    db: Session = Depends(get_db_read),
+    current_user: User = Depends(get_current_user)
+):
+    locked = list(data.locked)
+    if data.use_equipped:
+        if data.equipped_slot not in ("main", "sub"):
+            raise HTTPException(status_code=400, detail="Invalid equipped_slot")
+        locked += reroll_sim.locked_effects_from_modules(
+            crud.get_user_modules(db, current_user.id), data.module_type, data.equipped_slot
+        )
+
+    if not 0 <= data.rarity_cap < len(reroll_sim.RARITY_CHANCES):
+        raise HTTPException(status_code=400, detail="Invalid rarity_cap")
+
+    try:
+        return reroll_sim.simulate_reroll(
+            data.module_type,
+            data.targets,
+            locked=locked,
+            banned=data.banned,
+            rarity_cap=data.rarity_cap,
+            trials=max(1000, min(data.trials, 1_000_000))
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi.responses import PlainTextResponse
+from typing import List, Optional
+import hmac
+import profiling
+from schemas import ProfileMeta
+
+# 관리자 전용: X-Admin-Token 헤더가 PROFILE_ADMIN_TOKEN 과 일치해야 함 (미설정 시 비활성)
+def require_profile_admin(x_admin_token: Optional[str] = Header(None)):
+    if not profiling.PROFILE_ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, profiling.PROFILE_ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+router = APIRouter(
+    prefix="/api/admin/profiles",
+    tags=["admin"],
+    dependencies=[Depends(require_profile_admin)]
+)
+
+# 최근 프로파일 목록 (route/user 로 필터)
+@router.get("/", response_model=List[ProfileMeta])
+def list_profiles_api(
+    route: Optional[str] = None,
+    user: Optional[str] = None,
+    limit: int = 50
+):
+    profiles = profiling.list_profiles(limit=profiling.PROFILE_MAX_FILES)
+    if route:
+        profiles = [p for p in profiles if p["route"] == route]
+    if user:
+        profiles = [p for p in profiles if p["user"] == user]
+    return profiles[:min(limit, 200)]
+
+# 헤더 서명 발급 (X-Profile 값) - 특정 유저에게 잠시 전달해 느린 요청을 재현할 때 사용
+@router.post("/sign")
+def sign_profile_header_api(valid_minutes: int = 10):
+    return {"header": "X-Profile", "value": profiling.sign_profile_header(min(max(valid_minutes, 1), 60))}
+
+# 다운로드: 기본은 folded stack 텍스트 (speedscope / flamegraph.pl 에 그대로 입력)
+@router.get("/{profile_id}")
+def download_profile_api(profile_id: str, format: str = "folded"):
+    profile = profiling.load_profile(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "json":
+        return profile
+    if format != "folded":
+        raise HTTPException(status_code=400, detail="Invalid format. Use folded or json")
+    return PlainTextResponse(
+        profiling.to_folded(profile["stacks"]),
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.folded"'}
+    )
@@ -1,25 +1,42 @@
 from fastapi import APIRouter, Depends, HTTPException, Form, BackgroundTasks
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
 from database import get_db, get_db_read
 from schemas import (
     BattleMainResponse, 
     FullReportResponse, 
     WeeklyStatsResponse, 
     WeeklyTrendResponse, 
-    HistoryViewResponse
+    HistoryViewResponse,
+    BucketedStatsResponse,
+    ChangeFeedResponse,
+    MetricQueryRow,
+    MetricNamesResponse
 )
 import crud
-from parser import parse_battle_report
-from datetime import datetime
+from parser import parse_battle_report, report_content_hash
+from detail_codec import SECTION_COLUMNS
+from datetime import datetime, timedelta
 from typing import List, Optional
 from models import User
 from auth import get_current_user
+from ratelimit import RateLimit
+import events
 import slack
 
-router = APIRouter(prefix="/api/reports", tags=["reports"])
+# 유저별 기본 한도 (라우트별 한도는 각 엔드포인트에 추가로 적용)
+router = APIRouter(
+    prefix="/api/reports",
+    tags=["reports"],
+    dependencies=[Depends(RateLimit("reports", per_minute=120, burst=60))]
+)
 
 # 1. 생성 (POST)
-@router.post("/", response_model=BattleMainResponse)
+@router.post(
+    "/",
+    response_model=BattleMainResponse,
+    dependencies=[Depends(RateLimit("reports:create", per_minute=20, burst=10))]
+)
 def create_report(
     report_text: str = Form(...), 
     notes: Optional[str] = Form(None),
@@ -28,10 +45,27 @@ def create_report(
     current_user: User = Depends(get_current_user)
 ):
     try:
+        # 같은 원문 재제출(더블 붙여넣기, 재시도)은 파싱/저장 없이 기존 기록 반환 (새 메모가 있으면 메모만 갱신)
+        content_hash = report_content_hash(report_text)
+        existing = crud.get_report_by_hash(db, current_user.id, content_hash)
+        if existing:
+            return _duplicate_report(db, existing, notes, current_user.id)
+
         parsed_data = parse_battle_report(report_text)
-        result = crud.create_battle_record(db, parsed_data, current_user.id, notes)
+        try:
+            result = crud.create_battle_record(db, parsed_data, current_user.id, notes, content_hash=content_hash)
+        except IntegrityError:
+            # 같은 원문이 동시에 들어와 다른 요청이 먼저 저장함 (uq_owner_content_hash)
+            db.rollback()
+            existing = crud.get_report_by_hash(db, current_user.id, content_hash)
+            if not existing:
+                raise
+            return _duplicate_report(db, existing, notes, current_user.id)
+        events.notify_reports_changed(db, current_user.id, "report_ingested", result.battle_date)
         
         if background_tasks:
+            # 리더보드/백분위 뷰 갱신 (LEADERBOARD_REFRESH_SECONDS 마다 최대 1번)
+            background_tasks.add_task(crud.refresh_tier_aggregates_if_stale)
             try:
                 total_count = crud.count_reports(db)
                 if total_count % 10 == 0:
@@ -44,10 +78,21 @@ def create_report(
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+def _duplicate_report(db: Session, existing, notes: Optional[str], user_id: int):
+    if notes and notes != existing.notes:
+        crud.update_report_notes(db, existing, notes, user_id)
+        events.publish(user_id, "report_updated", {"battle_date": existing.battle_date.isoformat()})
+    existing.duplicate = True
+    return existing
+
 # 2. 통계 및 목록 조회
 
 # 기록실 메인 뷰 (최근 7일 상세 + 월별 요약)
-@router.get("/view", response_model=HistoryViewResponse)
+@router.get(
+    "/view",
+    response_model=HistoryViewResponse,
+    dependencies=[Depends(RateLimit("reports:history", per_minute=30, burst=15))]
+)
 def get_history_view_api(
     db: Session = Depends(get_db_read),
     current_user: User = Depends(get_current_user)
@@ -55,7 +100,11 @@ def get_history_view_api(
     return crud.get_history_view(db, current_user.id)
 
 # 월별 상세 기록 조회 (Lazy Load)
-@router.get("/month/{month_key}", response_model=List[BattleMainResponse])
+@router.get(
+    "/month/{month_key}",
+    response_model=List[BattleMainResponse],
+    dependencies=[Depends(RateLimit("reports:history", per_minute=30, burst=15))]
+)
 def get_reports_by_month_api(
     month_key: str,
     db: Session = Depends(get_db_read),
@@ -85,6 +134,134 @@ def get_history_reports(
 ):
     return crud.get_history_reports(db, current_user.id, skip=skip, limit=limit)
 
+# 조건 검색 (티어/웨이브/처치자/기간 필터 + 정렬)
+@router.get("/query", response_model=List[BattleMainResponse])
+def query_reports_api(
+    tier: Optional[str] = None,
+    min_wave: Optional[int] = None,
+    max_wave: Optional[int] = None,
+    killer: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    sort: str = "battle_date",
+    order: str = "desc",
+    skip: int = 0,
+    limit: int = 50,
+    db: Session = Depends(get_db_read),
+    current_user: User = Depends(get_current_user)
+):
+    if sort not in crud.report.QUERY_SORT_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"Invalid sort. Use one of {', '.join(crud.report.QUERY_SORT_COLUMNS)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="Invalid order. Use asc or desc")
+
+    return crud.query_reports(
+        db, current_user.id,
+        tier=tier, min_wave=min_wave, max_wave=max_wave, killer=killer,
+        start_date=start_date, end_date=end_date,
+        sort=sort, order=order, skip=skip, limit=min(limit, 200)
+    )
+
+# 메모/처치자 검색 (다음 페이지: 마지막 항목의 battle_date 를 before 로 전달)
+@router.get("/search", response_model=List[BattleMainResponse])
+def search_reports_api(
+    q: str,
+    before: Optional[datetime] = None,
+    limit: int = 30,
+    db: Session = Depends(get_db_read),
+    current_user: User = Depends(get_current_user)
+):
+    keyword = q.strip()
+    # 한 글자는 거의 모든 기록에 걸리므로 제외. 2자("보스", "오브")는 트라이그램 인덱스 대신 유저 범위 스캔 (crud.search_reports)
+    if len(keyword) < 2:
+        raise HTTPException(status_code=400, detail="Search keyword must be at least 2 characters")
+
+    return crud.search_reports(db, current_user.id, keyword, before=before, limit=min(limit, 100))
+
+# 상세 지표 이름 목록 (metric-query 의 선택지)
+@router.get("/metrics", response_model=MetricNamesResponse)
+def get_metric_names_api(
+    db: Session = Depends(get_db_read),
+    current_user: User = Depends(get_current_user)
+):
+    return {"sections": crud.get_metric_names(db, current_user.id)}
+
+# 상세 지표로 검색/정렬: ?section=combat&metric=오브 대미지&ratio_to=입힌 대미지&min_value=0.3
+@router.get("/metric-query", response_model=List[MetricQueryRow])
+def query_metric_api(
+    metric: str,
+    section: str = "combat",
+    ratio_to: Optional[str] = None,
+    tier: Optional[str] = None,
+    min_value: Optional[float] = None,
+    max_value: Optional[float] = None,
+    order: str = "desc",
+    limit: int = 50,
+    db: Session = Depends(get_db_read),
+    current_user: User = Depends(get_current_user)
+):
+    if section not in SECTION_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"Invalid section. Use {', '.join(SECTION_COLUMNS)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="Invalid order. Use asc or desc")
+
+    rows = crud.query_metric(
+        db, current_user.id, section, metric.strip(),
+        ratio_to=ratio_to.strip() if ratio_to else None,
+        tier=tier, min_value=min_value, max_value=max_value,
+        order=order, limit=min(limit, 200)
+    )
+    if rows is None:
+        raise HTTPException(status_code=404, detail="Unknown metric")
+    return rows
+
+# 델타 동기화 (클라이언트 로컬 캐시용) - since=0 이면 전체 스냅샷 (cursor 로 페이지 이어받기)
+@router.get("/changes", response_model=ChangeFeedResponse)
+def get_changes_api(
+    since: int = 0,
+    limit: int = 500,
+    cursor: Optional[datetime] = None,
+    db: Session = Depends(get_db_read),
+    current_user: User = Depends(get_current_user)
+):
+    return crud.get_changes_since(db, current_user.id, since, limit=min(limit, 1000), cursor=cursor)
+
+# 범용 통계 (지표 x 구간 x 기간 x 티어)
+@router.get("/stats", response_model=BucketedStatsResponse)
+def get_bucketed_stats_api(
+    metrics: str = "coins,cells",
+    bucket: str = "day",
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    tier: Optional[str] = None,
+    db: Session = Depends(get_db_read),
+    current_user: User = Depends(get_current_user)
+):
+    metric_list = [m.strip() for m in metrics.split(",") if m.strip()]
+    invalid = [m for m in metric_list if m not in crud.stats.STAT_METRICS]
+    if not metric_list or invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid metrics. Use {', '.join(crud.stats.STAT_METRICS)}")
+    if bucket not in crud.stats.STAT_BUCKETS:
+        raise HTTPException(status_code=400, detail="Invalid bucket. Use day, week or month")
+
+    # 기본 기간: 어제까지 최근 30일
+    end_date = end_date or (crud.stats.get_yesterday() + timedelta(days=1))
+    start_date = start_date or (end_date - timedelta(days=30))
+
+    # 구간이 너무 많으면 generate_series 결과가 커지므로 제한
+    max_days = {"day": 366, "week": 366 * 7, "month": 366 * 10}[bucket]
+    if start_date >= end_date or (end_date - start_date).days > max_days:
+        raise HTTPException(status_code=400, detail="Invalid date range")
+
+    buckets = crud.get_bucketed_stats(
+        db, current_user.id, metric_list, bucket,
+        start_date=start_date, end_date=end_date, tier=tier
+    )
+    for b in buckets:
+        b["bucket_start"] = b["bucket_start"].strftime("%Y-%m-%d")
+
+    return {"bucket": bucket, "metrics": metric_list, "buckets": buckets}
+
 @router.get("/weekly-stats", response_model=WeeklyStatsResponse)
 def get_weekly_stats_api(
     db: Session = Depends(get_db_read),
@@ -101,15 +278,106 @@ def get_weekly_trends_api(
 
 # 3. 상세 조회 및 삭제
 
+def _parse_sections(sections: Optional[str]):
+    """"combat,bot" -> ["combat_json", "bot_json"] (없으면 전체)"""
+    if not sections:
+        return None
+    names = [s.strip() for s in sections.split(",") if s.strip()]
+    invalid = [s for s in names if s not in SECTION_COLUMNS]
+    if not names or invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid sections. Use {', '.join(SECTION_COLUMNS)}")
+    return [SECTION_COLUMNS[s] for s in names]
+
+# 여러 기록 상세 한 번에 조회 (비교 화면): ?dates=2024-01-01T10:00:00,2024-01-02T11:00:00&sections=combat
+@router.get("/batch", response_model=List[FullReportResponse])
+def get_report_details_batch(
+    dates: str,
+    sections: Optional[str] = None,
+    db: Session = Depends(get_db_read),
+    current_user: User = Depends(get_current_user)
+):
+    section_columns = _parse_sections(sections)
+    try:
+        date_list = [datetime.fromisoformat(d.strip()) for d in dates.split(",") if d.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format")
+    if not date_list or len(date_list) > crud.report.MAX_BATCH_REPORTS:
+        raise HTTPException(status_code=400, detail=f"dates must contain 1 to {crud.report.MAX_BATCH_REPORTS} items")
+
+    return crud.get_full_reports(db, date_list, current_user.id, sections=section_columns)
+
+# 일괄 삭제 (기간 / 월 / 전체) - /{battle_date} 보다 먼저 선언
+def _bulk_delete(db: Session, user: User, background_tasks: BackgroundTasks, start_date=None, end_date=None):
+    deleted = crud.bulk_delete_reports(db, user.id, start_date, end_date)
+    if deleted:
+        events.publish(user.id, "reports_bulk_deleted", {
+            "count": deleted,
+            "start_date": start_date.isoformat() if start_date else None,
+            "end_date": end_date.isoformat() if end_date else None,
+            "version": crud.get_current_version(db, user.id)
+        })
+        if background_tasks:
+            background_tasks.add_task(crud.refresh_tier_aggregates_if_stale)
+    return {"status": "success", "deleted": deleted}
+
+@router.delete(
+    "/range",
+    dependencies=[Depends(RateLimit("reports:bulk-delete", per_minute=5, burst=3))]
+)
+def delete_reports_in_range(
+    start_date: datetime,
+    end_date: datetime,
+    background_tasks: BackgroundTasks = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    if start_date >= end_date:
+        raise HTTPException(status_code=400, detail="Invalid date range")
+    return _bulk_delete(db, current_user, background_tasks, start_date, end_date)
+
+@router.delete(
+    "/month/{month_key}",
+    dependencies=[Depends(RateLimit("reports:bulk-delete", per_minute=5, burst=3))]
+)
+def delete_reports_in_month(
+    month_key: str,
+    background_tasks: BackgroundTasks = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    try:
+        start_date = datetime.strptime(month_key, "%Y-%m")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid month format. Use YYYY-MM")
+    end_date = (start_date + timedelta(days=32)).replace(day=1)
+    return _bulk_delete(db, current_user, background_tasks, start_date, end_date)
+
+@router.delete(
+    "/all",
+    dependencies=[Depends(RateLimit("reports:bulk-delete", per_minute=5, burst=3))]
+)
+def delete_all_reports(
+    confirm: bool = False,
+    background_tasks: BackgroundTasks = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    # 실수 방지: ?confirm=true 를 명시해야 전체 삭제
+    if not confirm:
+        raise HTTPException(status_code=400, detail="Pass confirm=true to delete all reports")
+    return _bulk_delete(db, current_user, background_tasks)
+
 @router.get("/{battle_date}", response_model=FullReportResponse)
 def get_report_detail(
     battle_date: str, 
+    sections: Optional[str] = None,
     db: Session = Depends(get_db_read),
     current_user: User = Depends(get_current_user)
 ):
+    section_columns = _parse_sections(sections)
     try:
         date_obj = datetime.fromisoformat(battle_date)
-        report = crud.get_full_report(db, date_obj, current_user.id)
+        report = crud.get_full_report(db, date_obj, current_user.id, sections=section_columns)
         if not report:
             raise HTTPException(status_code=404, detail="Report not found")
         return report
@@ -127,6 +395,7 @@ def delete_report(
         success = crud.delete_battle_record(db, date_obj, current_user.id)
         if not success:
              raise HTTPException(status_code=404, detail="Report not found")
+        events.notify_reports_changed(db, current_user.id, "report_deleted", date_obj)
         return {"status": "success", "message": "Record deleted successfully"}
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format")
\ No newline at end of file
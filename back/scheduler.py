@@ -0,0 +1,243 @@
+# back/scheduler.py
+# 백엔드 내장 유지보수 스케줄러
+# - gunicorn 워커마다 스레드가 뜨지만, Postgres 세션 advisory lock 을 잡은 워커 하나만 작업을 실행 (리더)
+# - 리더 워커가 죽으면 락을 잡고 있던 커넥션이 끊기면서 락이 풀리고, 다른 워커가 다음 폴링 때 이어받음
+# - 작업마다 주기 + 지터, 타임아웃, 실행 이력(job_runs)을 가짐
+# - 리더 스레드는 작업을 실행 스레드에 넘기기만 하고 기다리지 않음 (긴 작업 중에도 리더 확인/다른 작업 계속)
+# 상태 확인: python scheduler.py status
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine, func, text
+from sqlalchemy.pool import NullPool
+from dotenv import load_dotenv
+
+from database import DATABASE_URL_DIRECT, SessionLocal
+
+load_dotenv()
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1") == "1"
+SCHEDULER_LOCK_KEY = 7402004
+TICK_SECONDS = 5          # 리더: 작업 확인 + 락 커넥션 생존 확인 주기
+POLL_SECONDS = 30         # 비리더: 락 획득 재시도 주기 (+ 지터)
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+class Job:
+    def __init__(self, name: str, func, interval: int, timeout: int, jitter: int = 0):
+        self.name = name
+        self.func = func
+        self.interval = interval  # 초
+        self.timeout = timeout    # 초 - 넘기면 timeout 으로 기록 (스레드는 강제 종료할 수 없어 끝날 때까지 다음 실행을 건너뜀)
+        self.jitter = jitter      # 초 - 여러 작업이 같은 순간에 몰리지 않도록
+
+class _Run:
+    """실행 중인 작업 하나 (job_runs 행 id, 시작 시각, Future)"""
+    def __init__(self, run_id: int, started: float):
+        self.run_id = run_id
+        self.started = started
+        self.future = None
+        self.timed_out = False
+        self.finished = False
+
+class Scheduler:
+    def __init__(self, jobs):
+        self.jobs = {job.name: job for job in jobs}
+        self._next_run = {}
+        self._running = {}   # name -> _Run (마지막 실행. 타임아웃 후에도 아직 돌 수 있음)
+        self._runs_lock = threading.Lock()
+        self._lock_conn = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._executor = ThreadPoolExecutor(max_workers=max(len(self.jobs), 1), thread_name_prefix="scheduler-job")
+        # 락 전용 커넥션은 풀 밖에서 (요청용 풀을 하나 계속 점유하지 않도록, DB_RESERVED_CONNECTIONS 몫)
+        # 세션 락이라 트랜잭션 풀러를 거치면 안 됨 -> 풀러 모드에서는 POSTGRES_SERVER_DIRECT 로 직접 연결
+        self._lock_engine = create_engine(DATABASE_URL_DIRECT, poolclass=NullPool)
+
+    # 1. 리더 선출
+    def _try_acquire(self) -> bool:
+        conn = self._lock_engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        try:
+            locked = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": SCHEDULER_LOCK_KEY}).scalar()
+        except Exception:
+            conn.close()
+            raise
+        if not locked:
+            conn.close()
+            return False
+
+        self._lock_conn = conn
+        self._load_next_runs()
+        print(f"[Scheduler] {WORKER_ID} became leader")
+        return True
+
+    def _still_leader(self) -> bool:
+        try:
+            self._lock_conn.execute(text("SELECT 1"))
+            return True
+        except Exception as e:
+            print(f"[Scheduler] Lost leader connection: {e}")
+            self._release()
+            return False
+
+    def _release(self):
+        if self._lock_conn is not None:
+            try:
+                self._lock_conn.close()  # 세션 종료 = 락 해제
+            except Exception:
+                pass
+            self._lock_conn = None
+
+    def _load_next_runs(self):
+        """이전 리더의 실행 이력에서 다음 실행 시각을 이어받음 (리더가 바뀔 때마다 바로 다시 돌지 않도록)"""
+        from models import JobRun
+
+        db = SessionLocal()
+        try:
+            last_runs = dict(
+                db.query(JobRun.job, func.max(JobRun.started_at))
+                .filter(JobRun.job.in_(list(self.jobs)))
+                .group_by(JobRun.job)
+                .all()
+            )
+        finally:
+            db.close()
+
+        now = _utcnow()
+        for name, job in self.jobs.items():
+            last = last_runs.get(name)
+            due = last + timedelta(seconds=job.interval) if last else now
+            self._next_run[name] = max(due, now) + timedelta(seconds=random.uniform(0, job.jitter))
+
+    # 2. 작업 실행
+    def _record_start(self, name: str) -> int:
+        from models import JobRun
+
+        db = SessionLocal()
+        try:
+            run = JobRun(job=name, status="running", worker=WORKER_ID, started_at=_utcnow())
+            db.add(run)
+            db.commit()
+            return run.id
+        finally:
+            db.close()
+
+    def _record_finish(self, run_id: int, status: str, result):
+        from models import JobRun
+
+        db = SessionLocal()
+        try:
+            db.query(JobRun).filter(JobRun.id == run_id).update({
+                "status": status,
+                "finished_at": _utcnow(),
+                "result": None if result is None else str(result)[:1000],
+            })
+            db.commit()
+        finally:
+            db.close()
+
+    def _dispatch(self, job: Job):
+        """작업을 실행 스레드에 넘기고 바로 돌아옴 (끝나면 콜백에서 이력 기록). 이전 실행이 아직 돌고 있으면 건너뜀"""
+        previous = self._running.get(job.name)
+        if previous and not previous.future.done():
+            print(f"[Scheduler] {job.name} is still running, skipping")
+            return
+
+        run = _Run(self._record_start(job.name), time.monotonic())
+        run.future = self._executor.submit(job.func)
+        self._running[job.name] = run
+        run.future.add_done_callback(lambda f: self._on_done(job, run))
+
+    def _on_done(self, job: Job, run: "_Run"):
+        error = run.future.exception()
+        if error:
+            print(f"[Scheduler] {job.name} Error: {error}")
+        with self._runs_lock:
+            timed_out = run.timed_out
+            run.finished = True
+        if timed_out:
+            # 타임아웃으로 이미 기록됨 -> 늦게라도 끝난 결과를 남김
+            self._record_finish(run.run_id, "error" if error else "timeout", error or f"finished late: {run.future.result()}")
+        else:
+            self._record_finish(run.run_id, "error" if error else "ok", error or run.future.result())
+
+    def _check_timeouts(self):
+        """타임아웃을 넘긴 작업은 timeout 으로 기록 (스레드는 끝날 때까지 두고, 그동안 같은 작업은 건너뜀)"""
+        now = time.monotonic()
+        for name, run in self._running.items():
+            job = self.jobs[name]
+            with self._runs_lock:
+                if run.finished or run.timed_out or now - run.started < job.timeout:
+                    continue
+                run.timed_out = True
+            self._record_finish(run.run_id, "timeout", f"exceeded {job.timeout}s")
+
+    def _tick(self):
+        self._check_timeouts()
+        now = _utcnow()
+        for name, job in self.jobs.items():
+            if self._stop.is_set():
+                return
+            if self._next_run.get(name, now) > now:
+                continue
+            # 디스패치 직전마다 리더 재확인 (락 커넥션이 끊겼으면 다른 워커가 이미 리더일 수 있음)
+            if not self._still_leader():
+                return
+            self._dispatch(job)
+            self._next_run[name] = _utcnow() + timedelta(seconds=job.interval + random.uniform(0, job.jitter))
+
+    # 3. 메인 루프
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                if self._lock_conn is None:
+                    self._try_acquire()
+                elif self._still_leader():
+                    self._tick()
+            except Exception as e:
+                print(f"[Scheduler] Error: {e}")
+                self._release()
+
+            wait = TICK_SECONDS if self._lock_conn is not None else POLL_SECONDS + random.uniform(0, POLL_SECONDS / 2)
+            self._stop.wait(wait)
+
+        self._release()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=TICK_SECONDS * 2)
+        self._executor.shutdown(wait=False)
+
+def print_status(limit: int = 20):
+    import crud  # models 보다 먼저 로드되어야 함 (순환 import)
+    from models import JobRun
+
+    db = SessionLocal()
+    try:
+        runs = db.query(JobRun).order_by(JobRun.id.desc()).limit(limit).all()
+        for run in runs:
+            duration = (run.finished_at - run.started_at).total_seconds() if run.finished_at else None
+            took = f"{duration:.1f}s" if duration is not None else "-"
+            print(f"{run.started_at:%Y-%m-%d %H:%M:%S}  {run.job:<22} {run.status:<8} {took:>8}  {run.worker}  {run.result or ''}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] != "status":
+        print("usage: python scheduler.py status")
+        sys.exit(1)
+    print_status()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union
 from datetime import datetime
 
 # 1. 유저 및 인증 (User & Auth) - [기존 코드 복구]
@@ -40,6 +40,32 @@ class UserModulesResponse(UserModulesBase):
     class Config:
         from_attributes = True
 
+class RerollSimulationRequest(BaseModel):
+    module_type: str                      # cannon | armor | generator | core
+    targets: List[str]                    # 목표 부옵션 id
+    locked: List[str] = []                # 이미 잠근 부옵션 id
+    banned: List[str] = []                # 금지(밴) 부옵션 id
+    rarity_cap: int = 5                   # 목표 등급 (0=Common ~ 5=Ancestral)
+    trials: int = 200000
+    use_equipped: bool = False            # 저장된 장착 모듈의 부옵션을 잠금으로 추가
+    equipped_slot: str = "main"           # use_equipped 때 읽을 슬롯 (main | sub)
+
+class RerollPercentiles(BaseModel):
+    p50: float
+    p90: float
+    p99: float
+
+class RerollHistogramBin(BaseModel):
+    cost_upper: float
+    probability: float
+
+class RerollSimulationResponse(BaseModel):
+    expected_cost: float                  # 정확한 기대 파편 비용
+    expected_rolls: float                 # 정확한 기대 리롤 횟수
+    trials: int
+    percentiles: RerollPercentiles        # 시뮬레이션 분포
+    histogram: List[RerollHistogramBin]
+
 # 3. 전투 기록 (Report)
 
 class DamageItem(BaseModel):
@@ -47,6 +73,20 @@ class DamageItem(BaseModel):
     value: str
     raw: float = 0.0  # [New] 정렬 및 계산을 위한 숫자형 데이터
 
+# 내 같은 티어 평소 기록과의 비교 (mean 이하 항목은 비교 대상이 5판 이상일 때만 채워짐)
+class RunMetricComparison(BaseModel):
+    value: float
+    runs: int                         # 비교 대상 판 수 (이 판 제외)
+    mean: Optional[float] = None
+    stddev: Optional[float] = None
+    z_score: Optional[float] = None
+    percentile: Optional[float] = None  # 0~100
+    flag: Optional[str] = None          # high | low
+
+class RunComparison(BaseModel):
+    tier: str
+    metrics: Dict[str, RunMetricComparison]  # coins_per_hour | cells | wave | real_time
+
 class BattleMainResponse(BaseModel):
     battle_date: datetime
     created_at: Optional[datetime] = None
@@ -64,11 +104,19 @@ class BattleMainResponse(BaseModel):
     killer: str
     damage_dealt: str
     damage_taken: str
+
+    game_time_seconds: Optional[int] = None
+    real_time_seconds: Optional[int] = None
+    damage_dealt_value: Optional[float] = None
+    damage_taken_value: Optional[float] = None
     
     notes: Optional[str] = None
     
     top_damages: List[DamageItem] = []
 
+    duplicate: bool = False  # [New] 이미 제출된 원문이라 저장을 건너뛰었는지 (새 메모는 기존 기록에 반영)
+    comparison: Optional[RunComparison] = None  # [New] 생성/상세 응답에만 포함
+
     class Config:
         from_attributes = True
 
@@ -106,6 +154,16 @@ class WeeklyTrendStat(BaseModel):
 class WeeklyTrendResponse(BaseModel):
     weekly_stats: List[WeeklyTrendStat]
 
+class StatBucket(BaseModel):
+    bucket_start: str                         # 구간 시작일 (YYYY-MM-DD)
+    values: Dict[str, Union[int, float]]      # 지표별 값
+    growth: Dict[str, float]                  # 지표별 직전 구간 대비 증감률 (%)
+
+class BucketedStatsResponse(BaseModel):
+    bucket: str
+    metrics: List[str]
+    buckets: List[StatBucket]
+
 # 5. 기록실 최적화 뷰 (History View)
 class MonthlySummary(BaseModel):
     month_key: str        # 예: "2023-12"
@@ -116,4 +174,60 @@ class MonthlySummary(BaseModel):
 
 class HistoryViewResponse(BaseModel):
     recent_reports: List[BattleMainResponse]  # 최근 7일치 상세
-    monthly_summaries: List[MonthlySummary]   # 그 이전 월별 요약
\ No newline at end of file
+    monthly_summaries: List[MonthlySummary]   # 그 이전 월별 요약
+
+# 6. 리더보드 (Leaderboard)
+class LeaderboardEntry(BaseModel):
+    rank: int
+    username: str
+    value: int
+    runs: int
+
+class LeaderboardResponse(BaseModel):
+    tier: str
+    metric: str
+    entries: List[LeaderboardEntry]
+    my_rank: Optional[int] = None
+    my_best: Optional[int] = None
+
+class RunPercentileResponse(BaseModel):
+    tier: str
+    runs: int                         # 해당 티어 전체 판 수
+    wave_percentile: float            # 0~100
+    coins_per_hour_percentile: float  # 0~100
+
+# 7. 델타 동기화 (Change Feed)
+class ChangeFeedResponse(BaseModel):
+    version: int                          # 다음 요청의 since 로 사용
+    reset: bool = False                   # True 면 로컬 캐시를 비우고 upserts 로 다시 채움
+    upserts: List[BattleMainResponse]     # 추가/수정된 기록
+    deletes: List[datetime]               # 삭제된 기록의 battle_date
+    has_more: bool = False                # True 면 version (+ cursor) 으로 바로 이어서 요청
+    cursor: Optional[datetime] = None     # 스냅샷 페이지 커서 (있으면 다음 요청에 since 와 같이 보냄)
+
+# 8. 상세 지표 검색 (Metric Query)
+class MetricQueryRow(BaseModel):
+    battle_date: datetime
+    tier: Optional[str] = None
+    wave: Optional[int] = None
+    value: Optional[float] = None       # 정렬 기준 (ratio_to 가 있으면 비율, 0.3 = 30%)
+    metric_value: float                 # 지표 숫자값
+    base_value: Optional[float] = None  # ratio_to 지표 숫자값
+
+class MetricNamesResponse(BaseModel):
+    sections: Dict[str, List[str]]      # combat | utility | enemy | bot -> 지표 이름
+
+# 9. 프로파일링 (Admin)
+class ProfileMeta(BaseModel):
+    id: str
+    reason: str                       # sampled | header
+    method: str
+    path: str
+    route: str
+    user: Optional[str] = None
+    status: Optional[int] = None
+    started_at: datetime
+    duration_ms: float
+    samples: int
+    interval_ms: float
+    concurrent_requests: int          # 1 보다 크면 다른 요청의 스택이 섞였을 수 있음
@@ -0,0 +1,31 @@
+from types import SimpleNamespace
+
+import detail_codec
+from benchmarks.bench_parser import SAMPLES
+from parser import parse_battle_report
+
+
+def test_display_text_round_trips_game_notation():
+    for raw in ("1.23S", "45.6B", "1.2M", "789.1Q", "12.34T", "321", "12", "0"):
+        assert detail_codec.display_text(detail_codec.typed_value(raw)) == raw
+
+
+def test_only_underivable_texts_are_stored():
+    assert detail_codec._stored_text("45.6B", detail_codec.typed_value("45.6B")) is None
+    assert detail_codec._stored_text("$12.3M", detail_codec.typed_value("$12.3M")) == "$12.3M"
+    assert detail_codec._stored_text("123,456", detail_codec.typed_value("123,456")) == "123,456"
+    assert detail_codec._stored_text("12.30B", detail_codec.typed_value("12.30B")) == "12.30B"
+    assert detail_codec._stored_text("N/A", None) == "N/A"
+
+
+def test_decode_rebuilds_original_detail(monkeypatch):
+    detail = parse_battle_report(SAMPLES["ko"])["detail"]
+    entries = [(s, n) for s, c in detail_codec.SECTION_COLUMNS.items() for n in detail[c]]
+    ids = {pair: i for i, pair in enumerate(entries, start=1)}
+    monkeypatch.setattr(detail_codec, "_ids_by_key", ids)
+    monkeypatch.setattr(detail_codec, "_keys_by_id", {i: pair for pair, i in ids.items()})
+
+    encoded = detail_codec.encode_detail(detail)
+    assert sum(t is not None for t in encoded["metric_texts"]) < len(entries) // 2
+    decoded = detail_codec.decode_detail(None, SimpleNamespace(**encoded))
+    assert decoded == detail
@@ -0,0 +1,33 @@
+from types import SimpleNamespace
+
+from crud import leaderboard
+from crud.leaderboard import percentile_from_cuts
+
+
+def test_best_run_in_a_flat_tier_is_100th_percentile():
+    assert percentile_from_cuts([5000] * 101, 5000) == 100.0
+
+
+def test_tie_with_minimum_uses_mid_rank():
+    cuts = [100] * 11 + list(range(101, 191))
+    assert percentile_from_cuts(cuts, 100) == 5.0
+    assert percentile_from_cuts(cuts, 99) == 0.0
+
+
+def test_interpolates_between_cuts():
+    cuts = [i * 10 for i in range(101)]
+    assert percentile_from_cuts(cuts, 255) == 25.5
+    assert percentile_from_cuts(cuts, 1000) == 100.0
+
+
+def test_failed_refresh_lock_still_throttles(monkeypatch):
+    class Db:
+        def execute(self, *args, **kwargs):
+            return SimpleNamespace(scalar=lambda: False)
+
+        def rollback(self):
+            pass
+
+    monkeypatch.setattr(leaderboard, "_last_refresh", 0.0)
+    assert leaderboard.refresh_tier_aggregates(Db()) is False
+    assert leaderboard._last_refresh > 0.0
@@ -0,0 +1,29 @@
+from parser import parse_battle_report, canonical_duration
+from benchmarks.bench_parser import SAMPLES, parsed_without_locale
+
+
+def test_same_report_parses_identically_in_both_languages():
+    assert parsed_without_locale(SAMPLES['ko']) == parsed_without_locale(SAMPLES['en'])
+
+
+def test_english_keys_map_to_korean_canonical_keys():
+    parsed = parse_battle_report(SAMPLES['en'])
+    assert parsed['main']['killer'] == '스캐터'
+    assert parsed['detail']['combat_json']['오브 대미지'] == '789.1Q'
+    assert parsed['detail']['utility_json']['블랙홀로 획득한 코인'] == '345.6B'
+    assert parsed['detail']['bot_json']['천둥 봇 기절'] == '1,234'
+    assert parsed['detail']['bot_json']['대미지'] == '1.2q'
+    assert all(key.isascii() is False for section in parsed['detail'].values() for key in section)
+
+
+def test_english_keys_are_case_insensitive():
+    text = SAMPLES['en'].replace('Orb Damage', 'orb damage').replace('Coins earned', 'Coins Earned')
+    parsed = parse_battle_report(text)
+    assert '오브 대미지' in parsed['detail']['combat_json']
+    assert parsed['main']['coin_earned'] == parse_battle_report(SAMPLES['en'])['main']['coin_earned']
+
+
+def test_canonical_duration():
+    assert canonical_duration('1d 2h 3m 4s') == '1일 2시간 3분 4초'
+    assert canonical_duration('5시간 6분 7초') == '5시간 6분 7초'
+    assert canonical_duration('') == ''
@@ -0,0 +1,75 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool, QueuePool
+
+from database import PoolAdmission, PoolBusyError
+
+
+def _admission(capacity=2, budget=0.5, pool_timeout=None):
+    engine = create_engine(
+        "sqlite://", poolclass=QueuePool, pool_size=capacity, max_overflow=0, pool_timeout=pool_timeout or budget,
+        connect_args={"check_same_thread": False}
+    )
+    return engine, sessionmaker(bind=engine), PoolAdmission(engine, budget, capacity)
+
+
+def test_admits_while_pool_has_free_connections():
+    engine, Session, admission = _admission()
+    admission.avg_wait = 10.0  # 과거 대기 시간이 길어도 지금 비어 있으면 통과
+    db = Session()
+    admission.checkout(db)
+    assert engine.pool.checkedout() == 1
+    db.close()
+
+
+def test_rejects_when_pool_is_exhausted_and_wait_exceeds_budget():
+    engine, Session, admission = _admission(capacity=2, budget=0.5)
+    holders = [Session(), Session()]
+    for db in holders:
+        admission.checkout(db)
+    assert admission.saturated()
+
+    # 커넥션을 오래 쥐고 있는 요청들 -> 앞사람이 끝나려면 예산보다 오래 걸림
+    admission.avg_hold = 2.0
+    started = time.monotonic()
+    with pytest.raises(PoolBusyError):
+        admission.checkout(Session())
+    assert time.monotonic() - started < 0.1  # pool_timeout 까지 기다리지 않음
+
+    holders[0].close()
+    assert not admission.saturated()
+    admission.checkout(holders[0])
+    for db in holders:
+        db.close()
+
+
+def test_rejects_from_measured_checkout_wait():
+    engine, Session, admission = _admission(capacity=1, budget=0.05, pool_timeout=2)
+    holder = Session()
+    admission.checkout(holder)
+
+    # 풀이 비기를 실제로 기다린 시간이 예산을 넘었으면, 점유 시간 추정이 짧아도 거절
+    waiter = Session()
+    release = threading.Timer(0.4, holder.close)
+    release.start()
+    admission.checkout(waiter)
+    release.join()
+    assert admission.avg_wait > admission.budget
+
+    admission.avg_hold = 0.0
+    with pytest.raises(PoolBusyError):
+        admission.checkout(Session())
+    waiter.close()
+
+
+def test_nullpool_is_never_rejected_locally():
+    engine = create_engine("sqlite://", poolclass=NullPool)
+    admission = PoolAdmission(engine, 0.1, 1)
+    admission.avg_hold = admission.avg_wait = 10.0
+    db = sessionmaker(bind=engine)()
+    admission.checkout(db)
+    db.close()
@@ -0,0 +1,51 @@
+# 실행: cd back && python -m pytest tests
+from types import SimpleNamespace
+import reroll_sim
+
+# ModulesInfoPage 가 저장하는 그대로의 형식 (owned_ -> inventory_json, equipped_* -> equipped_json)
+SAVED_MODULES = SimpleNamespace(
+    inventory_json={
+        "절멸자": {"rarity": 5, "effects": ["attack_speed", "crit_chance"]},
+        "사형 선고": {"rarity": 4, "effects": ["crit_factor"]},
+        "증폭 공격": 3,
+    },
+    equipped_json={
+        "equipped_cannon_main": {"name": "절멸자", "rarity": 5, "effects": ["attack_speed", "crit_chance"]},
+        "equipped_cannon_sub": {"name": "사형 선고", "rarity": 4},
+    },
+)
+
+def test_equipped_main_effects():
+    assert reroll_sim.locked_effects_from_modules(SAVED_MODULES, "cannon") == ["attack_speed", "crit_chance"]
+
+def test_equipped_sub_falls_back_to_inventory():
+    assert reroll_sim.locked_effects_from_modules(SAVED_MODULES, "cannon", "sub") == ["crit_factor"]
+
+def test_nothing_equipped():
+    assert reroll_sim.locked_effects_from_modules(SAVED_MODULES, "armor") == []
+    assert reroll_sim.locked_effects_from_modules(None, "cannon") == []
+
+def test_equipped_effects_are_locked_in_simulation():
+    locked = reroll_sim.locked_effects_from_modules(SAVED_MODULES, "cannon")
+    free = reroll_sim.simulate_reroll("cannon", ["attack_range"], trials=1000)
+    with_locked = reroll_sim.simulate_reroll("cannon", ["attack_range"], locked=locked, trials=1000)
+    # 잠금이 늘면 1회 비용(reroll_costs[잠금 수])이 올라감 -> 잠긴 옵션이 뽑기 풀에서 빠져 횟수는 줄어도 총비용은 증가
+    assert abs(with_locked["expected_cost"] / with_locked["expected_rolls"] - reroll_sim.REROLL_COSTS[len(locked)]) < 1e-6
+    assert with_locked["expected_cost"] / with_locked["expected_rolls"] > free["expected_cost"] / free["expected_rolls"]
+    assert with_locked["expected_rolls"] < free["expected_rolls"]
+    assert with_locked["expected_cost"] > free["expected_cost"]
+
+def test_single_target_matches_closed_form():
+    # 목표 1개, 잠금 없음: 매 회 목표가 나올 확률 a = (목표 등급 이상 확률) / (뽑기 풀 크기)
+    # 머무를 확률 stay = 1 - a -> 기대 횟수 1 / (1 - stay) = 1 / a
+    rarity_cap = 5
+    pool = sum(1 for e in reroll_sim.REROLL_DATA["effects"]["cannon"] if e["values"][rarity_cap] is not None)
+    a = sum(reroll_sim.RARITY_CHANCES[rarity_cap:]) / 100 / pool
+
+    r0, chain = reroll_sim._build_chain("cannon", ("attack_range",), (), (), rarity_cap)
+    assert r0 == 1
+    assert abs(chain[1][1] - (1 - a)) < 1e-12
+
+    cost, rolls = reroll_sim._expected(r0, chain)
+    assert abs(rolls - 1 / a) < 1e-6
+    assert abs(cost - reroll_sim.REROLL_COSTS[0] / a) < 1e-6
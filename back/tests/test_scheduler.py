@@ -0,0 +1,83 @@
+import threading
+import time
+
+import pytest
+
+import scheduler
+
+
+@pytest.fixture
+def make_scheduler(monkeypatch):
+    created = []
+
+    def make(jobs, leader=lambda: True):
+        sched = scheduler.Scheduler(jobs)
+        sched.records = []
+        ids = iter(range(1, 1000))
+        monkeypatch.setattr(sched, "_record_start", lambda name: next(ids))
+        monkeypatch.setattr(sched, "_record_finish", lambda run_id, status, result: sched.records.append((run_id, status)))
+        monkeypatch.setattr(sched, "_still_leader", leader)
+        created.append(sched)
+        return sched
+
+    yield make
+    for sched in created:
+        sched._executor.shutdown(wait=True)
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_tick_does_not_block_on_a_running_job(make_scheduler):
+    release = threading.Event()
+    fast_ran = threading.Event()
+    sched = make_scheduler([
+        scheduler.Job("slow", release.wait, interval=0, timeout=60),
+        scheduler.Job("fast", fast_ran.set, interval=0, timeout=60),
+    ])
+
+    started = time.monotonic()
+    sched._tick()
+    assert time.monotonic() - started < 0.5
+    assert fast_ran.wait(1)
+
+    # 이전 실행이 살아 있는 동안 같은 작업은 다시 디스패치하지 않음
+    slow_run = sched._running["slow"]
+    sched._tick()
+    assert sched._running["slow"] is slow_run
+
+    release.set()
+    assert _wait_for(lambda: (1, "ok") in sched.records)
+
+
+def test_timeout_is_recorded_while_job_keeps_running(make_scheduler):
+    release = threading.Event()
+    sched = make_scheduler([scheduler.Job("slow", release.wait, interval=0, timeout=0)])
+
+    sched._tick()
+    sched._check_timeouts()
+    assert sched.records == [(1, "timeout")]
+
+    release.set()
+    assert _wait_for(lambda: len(sched.records) == 2)
+    assert sched.records[1] == (1, "timeout")  # 늦게 끝난 결과
+
+
+def test_leadership_is_rechecked_before_each_dispatch(make_scheduler):
+    ran = []
+    checks = iter([True, False])
+    sched = make_scheduler(
+        [
+            scheduler.Job("first", lambda: ran.append("first"), interval=0, timeout=60),
+            scheduler.Job("second", lambda: ran.append("second"), interval=0, timeout=60),
+        ],
+        leader=lambda: next(checks),
+    )
+
+    sched._tick()
+    assert _wait_for(lambda: ran == ["first"])
+    assert "second" not in sched._running